@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import dataclasses
+import sys
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from dbgpt.core import LLMClient
@@ -24,7 +25,8 @@ class Agent:
         Args:
             name (str): name of the agent.
         """
-        self._name = name
+        # Names are compared and hashed on every speaker selection and message
+        self._name = sys.intern(name) if isinstance(name, str) else name
         self._describe = describe
 
         # the agent's collective memory
@@ -146,6 +148,57 @@ class Agent:
         """
 
 
+_PLAIN_ANNOTATIONS = frozenset(
+    {
+        "str",
+        "int",
+        "float",
+        "bool",
+        "Optional[str]",
+        "Optional[int]",
+        "Optional[float]",
+        "Optional[bool]",
+    }
+)
+
+
+def _to_plain(value: Any) -> Any:
+    """Convert nested dataclasses like dataclasses.asdict, without deepcopy."""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        to_dict = getattr(value, "to_dict", None)
+        return to_dict() if to_dict else dataclasses.asdict(value)
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_plain(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    return value
+
+
+def fast_todict(cls):
+    """Class decorator that generates a flat ``to_dict`` for a dataclass.
+
+    The generated method reads every field directly into a dict literal. Fields
+    annotated with plain scalar types are copied as is, others go through
+    :func:`_to_plain`.
+    """
+    items = []
+    for field in dataclasses.fields(cls):
+        annotation = field.type if isinstance(field.type, str) else ""
+        if annotation in _PLAIN_ANNOTATIONS:
+            items.append(f"{field.name!r}: self.{field.name}")
+        else:
+            items.append(f"{field.name!r}: _to_plain(self.{field.name})")
+    source = "def to_dict(self):\n    return {" + ", ".join(items) + "}\n"
+    namespace: Dict[str, Any] = {}
+    exec(source, {"_to_plain": _to_plain}, namespace)
+    to_dict = namespace["to_dict"]
+    to_dict.__qualname__ = f"{cls.__qualname__}.to_dict"
+    to_dict.__doc__ = f"Convert {cls.__name__} to a dict."
+    cls.to_dict = to_dict
+    return cls
+
+
+@fast_todict
 @dataclasses.dataclass
 class AgentResource:
     type: str
@@ -162,10 +215,8 @@ class AgentResource:
             introduce=d.get("introduce"),
         )
 
-    def to_dict(self) -> Dict[str, Any]:
-        return dataclasses.asdict(self)
-
 
+@fast_todict
 @dataclasses.dataclass
 class AgentContext:
     conv_id: str
@@ -184,6 +235,3 @@ class AgentContext:
     max_new_tokens: Optional[int] = 1024
     temperature: Optional[float] = 0.5
     allow_format_str_template: Optional[bool] = False
-
-    def to_dict(self) -> Dict[str, Any]:
-        return dataclasses.asdict(self)
@@ -2,7 +2,7 @@ import asyncio
 import copy
 import json
 import logging
-from typing import Any, Callable, Dict, List, Optional, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
 
 from dbgpt.agent.agents.llm.llm_client import AIWrapper
 from dbgpt.core.interface.message import ModelMessageRoleType
@@ -189,6 +189,17 @@ class ConversableAgent(Agent):
         # create oai message to be appended to the oai conversation that can be passed to oai directly.
         self._rely_messages.append(message)
 
+    def extend_rely_messages(
+        self, messages: List[Tuple[Union[Dict, str], str]]
+    ) -> None:
+        """Append several (message, role) pairs of relied messages at once."""
+        rely_messages = []
+        for message, role in messages:
+            message = self._message_to_dict(message)
+            message["role"] = role
+            rely_messages.append(message)
+        self._rely_messages.extend(rely_messages)
+
     def reset_rely_message(self) -> None:
         # create oai message to be appended to the oai conversation that can be passed to oai directly.
         self._rely_messages = []
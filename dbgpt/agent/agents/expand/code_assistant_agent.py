@@ -1,15 +1,100 @@
+import hashlib
 import json
-from typing import Callable, Dict, Literal, Optional, Union
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Literal, Optional, Tuple, Union
+
+from cachetools import TTLCache
 
 from dbgpt.core.interface.message import ModelMessageRoleType
-from dbgpt.util.code_utils import UNKNOWN, execute_code, extract_code, infer_lang
+from dbgpt.util.code_utils import (
+    UNKNOWN,
+    execute_code,
+    execute_code_in_pool,
+    execute_code_in_sandbox,
+    parse_code_blocks,
+)
+from dbgpt.util.executor_utils import blocking_func_to_async
 from dbgpt.util.string_utils import str_to_bool
-from dbgpt.util.utils import colored
 
 from ...memory.gpts_memory import GptsMemory
 from ..agent import Agent, AgentContext
 from ..base_agent import ConversableAgent
 
+logger = logging.getLogger(__name__)
+
+# Positive verification verdicts, so that identical checks in a conversation do
+# not pay for another LLM round-trip. Failed verdicts are never cached, a retry
+# always asks the model again.
+_VERIFY_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=60 * 30)
+
+
+def _verify_cache_key(
+    conv_id: Optional[str],
+    agent_name: str,
+    model: Optional[str],
+    task_gogal: Optional[str],
+    task_result: Optional[str],
+) -> str:
+    raw = "\x1e".join(
+        part or "" for part in (conv_id, agent_name, model, task_gogal, task_result)
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Successful code executions, scoped per conversation.
+
+    When the LLM answers a sub-task with code that has already run successfully
+    in the same conversation, the cached logs are replayed instead of spawning
+    the code again. Replaying is only correct for idempotent code (no side
+    effects, no time or environment dependent output), so agents use it only
+    when ``replay_idempotent_code`` is set in their code execution config.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: int = 60 * 60):
+        self._convs: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def _code_key(code_blocks: List[Tuple[str, str]]) -> str:
+        digest = hashlib.sha256()
+        for lang, code in code_blocks:
+            digest.update(f"{lang}\x1f{code}\x1e".encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(
+        self, conv_id: str, code_blocks: List[Tuple[str, str]]
+    ) -> Optional[Tuple[int, str]]:
+        plans = self._convs.get(conv_id)
+        if not plans:
+            return None
+        return plans.get(self._code_key(code_blocks))
+
+    def set(
+        self, conv_id: str, code_blocks: List[Tuple[str, str]], exitcode: int, logs: str
+    ):
+        plans = self._convs.get(conv_id)
+        if plans is None:
+            plans = {}
+            self._convs[conv_id] = plans
+        plans[self._code_key(code_blocks)] = (exitcode, logs)
+
+    def invalidate(self, conv_id: str):
+        """Forget the executions of a conversation, so that its code runs again."""
+        self._convs.pop(conv_id, None)
+
+
+_PLAN_CACHE = PlanCache()
+
+# Keys of code_execution_config that configure the agent rather than execute_code
+_AGENT_ONLY_CONFIG_KEYS = frozenset(
+    {"last_n_messages", "use_process_pool", "reuse_container", "replay_idempotent_code"}
+)
+
+# Code blocks are executed (file writes and subprocess waits) in worker threads so
+# that the event loop keeps scheduling other agents meanwhile.
+_CODE_EXECUTOR = ThreadPoolExecutor(thread_name_prefix="agent_code_executor")
+
 
 class CodeAssistantAgent(ConversableAgent):
     """(In preview) Assistant agent, designed to solve a task with LLM.
@@ -92,15 +177,28 @@ class CodeAssistantAgent(ConversableAgent):
         self._code_execution_config: Union[Dict, Literal[False]] = (
             {} if code_execution_config is None else code_execution_config
         )
+        if self._code_execution_config is False:
+            self._last_n_messages = 1
+            self._run_code_kwargs: Dict = {}
+        else:
+            self._last_n_messages = self._code_execution_config.get(
+                "last_n_messages", 1
+            )
+            self._run_code_kwargs = {
+                k: v
+                for k, v in self._code_execution_config.items()
+                if k not in _AGENT_ONLY_CONFIG_KEYS
+            }
         ### register code funtion
         self.register_reply(Agent, CodeAssistantAgent.generate_code_execution_reply)
 
     def _vis_code_idea(self, code, exit_success, log, language):
-        param = {}
-        param["exit_success"] = exit_success
-        param["language"] = language
-        param["code"] = code
-        param["log"] = log
+        param = {
+            "exit_success": exit_success,
+            "language": language,
+            "code": code,
+            "log": log,
+        }
 
         return f"```vis-code\n{json.dumps(param, ensure_ascii=False)}\n```"
 
@@ -118,13 +216,12 @@ class CodeAssistantAgent(ConversableAgent):
         if code_execution_config is False:
             return False, None
 
-        last_n_messages = code_execution_config.pop("last_n_messages", 1)
-
         # iterate through the last n messages reversly
         # if code blocks are found, execute the code blocks and return the output
         # if no code blocks are found, continue
 
-        code_blocks = extract_code(message)
+        parsed_blocks = parse_code_blocks(message)
+        code_blocks = [(lang, code) for lang, _, code in parsed_blocks]
 
         if len(code_blocks) < 1:
             self.send(
@@ -135,26 +232,28 @@ class CodeAssistantAgent(ConversableAgent):
                 f"Failed to get valid answer,{message}", self, reviewer, silent=True
             )
 
-        # found code blocks, execute code and push "last_n_messages" back
-        exitcode, logs = self.execute_code_blocks(code_blocks)
-        code_execution_config["last_n_messages"] = last_n_messages
+        # found code blocks, execute code
+        conv_id = self.agent_context.conv_id
+        replay = code_execution_config.get("replay_idempotent_code", False)
+        cached = _PLAN_CACHE.get(conv_id, code_blocks) if replay else None
+        if cached is not None:
+            exitcode, logs = cached
+        else:
+            exitcode, logs = await self.a_execute_code_blocks(parsed_blocks)
+            if replay and exitcode == 0:
+                _PLAN_CACHE.set(conv_id, code_blocks, exitcode, logs)
         exit_success = True if exitcode == 0 else False
         if exit_success:
-            return True, {
-                "is_exe_success": exit_success,
-                "content": f"{logs}",
-                "view": self._vis_code_idea(
-                    code_blocks, exit_success, logs, code_blocks[0][0]
-                ),
-            }
+            content = f"{logs}"
         else:
-            return True, {
-                "is_exe_success": exit_success,
-                "content": f"exitcode: {exitcode} (execution failed)\n {logs}",
-                "view": self._vis_code_idea(
-                    code_blocks, exit_success, logs, code_blocks[0][0]
-                ),
-            }
+            content = f"exitcode: {exitcode} (execution failed)\n {logs}"
+        return True, {
+            "is_exe_success": exit_success,
+            "content": content,
+            "view": self._vis_code_idea(
+                code_blocks, exit_success, logs, code_blocks[0][0]
+            ),
+        }
 
     async def a_verify(self, message: Optional[Dict]):
         self.update_system_message(self.CHECK_RESULT_SYSTEM_MESSAGE)
@@ -164,6 +263,22 @@ class CodeAssistantAgent(ConversableAgent):
         if action_report:
             task_result = action_report.get("content", "")
 
+        success, fail_reason = await self._a_check_result(task_gogal, task_result)
+        if not success:
+            # The task will be retried, so its code has to run again
+            _PLAN_CACHE.invalidate(self.agent_context.conv_id)
+        return success, fail_reason
+
+    async def _a_check_result(
+        self, task_gogal: Optional[str], task_result: str
+    ) -> Tuple[bool, Optional[str]]:
+        conv_id = self.agent_context.conv_id
+        cache_key = _verify_cache_key(
+            conv_id, self.name, self._select_llm_model(), task_gogal, task_result
+        )
+        if cache_key in _VERIFY_CACHE:
+            return True, None
+
         check_result, model = await self.a_reasoning_reply(
             [
                 {
@@ -177,10 +292,14 @@ class CodeAssistantAgent(ConversableAgent):
             ]
         )
         success = str_to_bool(check_result)
-        fail_reason = None
-        if not success:
-            fail_reason = "The execution result of the code you wrote is judged as not answering the task question. Please re-understand and complete the task."
-        return success, fail_reason
+        if success:
+            # Keyed by the model that gave the verdict, it may be a fallback
+            _VERIFY_CACHE[
+                _verify_cache_key(conv_id, self.name, model, task_gogal, task_result)
+            ] = True
+            return True, None
+        fail_reason = "The execution result of the code you wrote is judged as not answering the task question. Please re-understand and complete the task."
+        return False, fail_reason
 
     @property
     def use_docker(self) -> Union[bool, str, None]:
@@ -207,49 +326,70 @@ class CodeAssistantAgent(ConversableAgent):
             logs (str): the logs of the code execution.
             image (str or None): the docker image used for the code execution.
         """
+        if self._code_execution_config and self._code_execution_config.get(
+            "reuse_container"
+        ):
+            return execute_code_in_sandbox(code, **kwargs)
         return execute_code(code, **kwargs)
 
-    def execute_code_blocks(self, code_blocks):
-        """Execute the code blocks and return the result."""
-        logs_all = ""
+    async def a_execute_code_blocks(self, code_blocks):
+        """Execute the code blocks without blocking the event loop."""
+        return await blocking_func_to_async(
+            _CODE_EXECUTOR, self.execute_code_blocks, code_blocks
+        )
+
+    def _run_shell_block(self, lang: str, code: str, filename: Optional[str]):
+        return self.run_code(code, lang=lang, **self._run_code_kwargs)
+
+    def _run_python_block(self, lang: str, code: str, filename: Optional[str]):
+        if self._code_execution_config.get("use_process_pool") and not self.use_docker:
+            return execute_code_in_pool(
+                code,
+                timeout=self._code_execution_config.get("timeout"),
+                filename=filename,
+                work_dir=self._code_execution_config.get("work_dir"),
+            )
+        return self.run_code(
+            code,
+            lang="python",
+            filename=filename,
+            **self._run_code_kwargs,
+        )
+
+    def _run_unknown_block(self, lang: str, code: str, filename: Optional[str]):
+        # In case the language is not supported, we return an error message.
+        return 1, f"unknown language {lang}", None
+
+    # Lower-cased code block language -> handler
+    LANG_DISPATCH: Dict[str, Callable] = {
+        "bash": _run_shell_block,
+        "shell": _run_shell_block,
+        "sh": _run_shell_block,
+        "python": _run_python_block,
+    }
+
+    def execute_code_blocks(self, code_blocks: List[Tuple[str, Optional[str], str]]):
+        """Execute the code blocks and return the result.
+
+        Args:
+            code_blocks: (language, filename, code) tuples, as returned by
+                :func:`dbgpt.util.code_utils.parse_code_blocks`.
+        """
+        logs_parts: List[str] = []
         exitcode = -1
-        for i, code_block in enumerate(code_blocks):
-            lang, code = code_block
-            if not lang:
-                lang = infer_lang(code)
-            print(
-                colored(
-                    f"\n>>>>>>>> EXECUTING CODE BLOCK {i} (inferred language is {lang})...",
-                    "red",
-                ),
-                flush=True,
+        for i, (lang, filename, code) in enumerate(code_blocks):
+            logger.debug(
+                "EXECUTING CODE BLOCK %s (inferred language is %s)...", i, lang
+            )
+            handler = self.LANG_DISPATCH.get(
+                lang, CodeAssistantAgent._run_unknown_block
             )
-            if lang in ["bash", "shell", "sh"]:
-                exitcode, logs, image = self.run_code(
-                    code, lang=lang, **self._code_execution_config
-                )
-            elif lang in ["python", "Python"]:
-                if code.startswith("# filename: "):
-                    filename = code[11 : code.find("\n")].strip()
-                else:
-                    filename = None
-                exitcode, logs, image = self.run_code(
-                    code,
-                    lang="python",
-                    filename=filename,
-                    **self._code_execution_config,
-                )
-            else:
-                # In case the language is not supported, we return an error message.
-                exitcode, logs, image = (
-                    1,
-                    f"unknown language {lang}",
-                    None,
-                )
-                # raise NotImplementedError
+            exitcode, logs, image = handler(self, lang, code, filename)
             if image is not None:
                 self._code_execution_config["use_docker"] = image
-            logs_all += "\n" + logs
+                self._run_code_kwargs["use_docker"] = image
+            logs_parts.append("\n")
+            logs_parts.append(logs)
             if exitcode != 0:
-                return exitcode, logs_all
-        return exitcode, logs_all
+                break
+        return exitcode, "".join(logs_parts)
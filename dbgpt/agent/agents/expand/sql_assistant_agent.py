@@ -1,8 +1,11 @@
+import json
 from typing import Callable, Dict, Literal, Optional, Union
 
 from dbgpt._private.config import Config
 from dbgpt.agent.agents.base_agent import ConversableAgent
 from dbgpt.agent.plugin.commands.command_mange import ApiCall
+from dbgpt.component import ComponentType
+from dbgpt.util.executor_utils import ExecutorFactory, blocking_func_to_async
 
 from ...memory.gpts_memory import GptsMemory
 from ..agent import Agent, AgentContext
@@ -62,14 +65,36 @@ class SQLAssistantAgent(ConversableAgent):
         self.db_connect = CFG.LOCAL_DB_MANAGE.get_connect(
             self.agent_context.resource_db.get("name", None)
         )
+        self._run_to_df = self.db_connect.run_to_df
+        self.api_call = ApiCall(display_registry=[])
+        # The executor to run the blocking sql queries, resolved on first use
+        self._executor = None
+        self._system_render_key: Optional[str] = None
+        self._rendered_system_message: Optional[str] = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = CFG.SYSTEM_APP.get_component(
+                ComponentType.EXECUTOR_DEFAULT, ExecutorFactory
+            ).create()
+        return self._executor
 
     async def a_system_fill_param(self):
-        params = {
-            "data_structure": self.db_connect.get_table_info(),
-            "disply_type": ApiCall.default_chart_type_promot(),
-            "dialect": self.db_connect.db_type,
-        }
-        self.update_system_message(self.DEFAULT_SYSTEM_MESSAGE.format(**params))
+        # The table structure only changes with the database resource, so render
+        # the system message once per resource instead of on every reply.
+        render_key = json.dumps(
+            self.agent_context.resource_db, sort_keys=True, default=str
+        )
+        if render_key != self._system_render_key:
+            params = {
+                "data_structure": self.db_connect.get_table_info(),
+                "disply_type": ApiCall.default_chart_type_promot(),
+                "dialect": self.db_connect.db_type,
+            }
+            self._rendered_system_message = self.DEFAULT_SYSTEM_MESSAGE.format(**params)
+            self._system_render_key = render_key
+        self.update_system_message(self._rendered_system_message)
 
     async def generate_analysis_chart_reply(
         self,
@@ -84,12 +109,15 @@ class SQLAssistantAgent(ConversableAgent):
         # if code blocks are found, execute the code blocks and return the output
         # if no code blocks are found, continue
 
-        self.api_call = ApiCall(display_registry=[])
+        self.api_call.reset()
         if self.api_call.check_have_plugin_call(message):
             exit_success = True
             try:
-                chart_vis = self.api_call.display_sql_llmvis(
-                    message, self.db_connect.run_to_df
+                chart_vis = await blocking_func_to_async(
+                    self.executor,
+                    self.api_call.display_sql_llmvis,
+                    message,
+                    self._run_to_df,
                 )
             except Exception as e:
                 err_info = f"{str(e)}"
@@ -0,0 +1,164 @@
+import pytest
+
+from dbgpt.agent.agents.agent import AgentContext
+from dbgpt.agent.agents.expand import code_assistant_agent
+from dbgpt.agent.agents.expand.code_assistant_agent import (
+    CodeAssistantAgent,
+    PlanCache,
+)
+from dbgpt.agent.memory.gpts_memory import GptsMemory
+from dbgpt.core.interface.llm import ModelMetadata
+
+_CODE_MESSAGE = "```python\nprint('hello')\n```"
+
+
+@pytest.fixture(autouse=True)
+def plan_cache(monkeypatch):
+    cache = PlanCache()
+    monkeypatch.setattr(code_assistant_agent, "_PLAN_CACHE", cache)
+    return cache
+
+
+def _agent(code_execution_config=None, exitcode=0, conv_id="test_conv"):
+    agent = CodeAssistantAgent(
+        agent_context=AgentContext(
+            conv_id=conv_id,
+            llm_provider=None,
+            llm_models=[ModelMetadata(model="model1"), ModelMetadata(model="model2")],
+        ),
+        memory=GptsMemory(),
+        code_execution_config=code_execution_config,
+    )
+    agent.executed = 0
+
+    async def fake_execute(code_blocks):
+        agent.executed += 1
+        return exitcode, f"run {agent.executed}"
+
+    agent.a_execute_code_blocks = fake_execute
+    return agent
+
+
+def test_plan_cache_hit_and_miss():
+    cache = PlanCache()
+    blocks = [("python", "print(1)")]
+    assert cache.get("conv1", blocks) is None
+    cache.set("conv1", blocks, 0, "1")
+    assert cache.get("conv1", blocks) == (0, "1")
+    assert cache.get("conv2", blocks) is None
+    assert cache.get("conv1", [("python", "print(2)")]) is None
+    assert cache.get("conv1", [("sh", "print(1)")]) is None
+
+
+def test_plan_cache_invalidate():
+    cache = PlanCache()
+    blocks = [("python", "print(1)")]
+    cache.set("conv1", blocks, 0, "1")
+    cache.set("conv2", blocks, 0, "1")
+    cache.invalidate("conv1")
+    assert cache.get("conv1", blocks) is None
+    assert cache.get("conv2", blocks) == (0, "1")
+
+
+@pytest.mark.asyncio
+async def test_code_runs_again_without_replay():
+    agent = _agent()
+    await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    _, reply = await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    assert agent.executed == 2
+    assert reply["content"] == "run 2"
+
+
+@pytest.mark.asyncio
+async def test_replay_idempotent_code():
+    agent = _agent({"replay_idempotent_code": True})
+    await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    _, reply = await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    assert agent.executed == 1
+    assert reply["content"] == "run 1"
+
+
+@pytest.mark.asyncio
+async def test_failed_runs_are_not_replayed():
+    agent = _agent({"replay_idempotent_code": True}, exitcode=1)
+    await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    assert agent.executed == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_verification_invalidates_replay():
+    agent = _agent({"replay_idempotent_code": True})
+
+    async def fake_check(task_gogal, task_result):
+        return False, "not answered"
+
+    agent._a_check_result = fake_check
+    await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    success, _ = await agent.a_verify(
+        {"current_gogal": "say hello", "action_report": {"content": "run 1"}}
+    )
+    assert not success
+    await agent.generate_code_execution_reply(_CODE_MESSAGE)
+    assert agent.executed == 2
+
+
+@pytest.fixture
+def verify_cache(monkeypatch):
+    cache = {}
+    monkeypatch.setattr(code_assistant_agent, "_VERIFY_CACHE", cache)
+    return cache
+
+
+def _fake_reasoning(agent, verdict="True"):
+    calls = []
+
+    async def fake_reasoning_reply(messages):
+        calls.append(agent._select_llm_model())
+        return verdict, agent._select_llm_model()
+
+    agent.a_reasoning_reply = fake_reasoning_reply
+    return calls
+
+
+_VERIFY_MESSAGE = {"current_gogal": "say hello", "action_report": {"content": "hello"}}
+
+
+@pytest.mark.asyncio
+async def test_verify_verdicts_are_cached(verify_cache):
+    agent = _agent()
+    calls = _fake_reasoning(agent)
+    assert await agent.a_verify(_VERIFY_MESSAGE) == (True, None)
+    assert await agent.a_verify(_VERIFY_MESSAGE) == (True, None)
+    assert len(calls) == 1
+
+    other = {"current_gogal": "say hello", "action_report": {"content": "bye"}}
+    await agent.a_verify(other)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_verdicts_are_not_cached(verify_cache):
+    agent = _agent()
+    calls = _fake_reasoning(agent, "False")
+    success, fail_reason = await agent.a_verify(_VERIFY_MESSAGE)
+    assert not success and fail_reason
+    assert not (await agent.a_verify(_VERIFY_MESSAGE))[0]
+    assert len(calls) == 2
+    assert verify_cache == {}
+
+
+@pytest.mark.asyncio
+async def test_verdicts_are_scoped_to_conversation_and_model(verify_cache):
+    agent = _agent()
+    calls = _fake_reasoning(agent)
+    await agent.a_verify(_VERIFY_MESSAGE)
+
+    other_conv = _agent(conv_id="other_conv")
+    other_conv_calls = _fake_reasoning(other_conv)
+    await other_conv.a_verify(_VERIFY_MESSAGE)
+    assert len(other_conv_calls) == 1
+
+    agent.agent_context.model_priority = {"default": ["model2"]}
+    await agent.a_verify(_VERIFY_MESSAGE)
+    assert calls == ["model1", "model2"]
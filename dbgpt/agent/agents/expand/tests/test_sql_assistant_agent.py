@@ -0,0 +1,63 @@
+import pytest
+
+from dbgpt.agent.agents.agent import AgentContext
+from dbgpt.agent.agents.expand.sql_assistant_agent import CFG, SQLAssistantAgent
+from dbgpt.agent.memory.gpts_memory import GptsMemory
+from dbgpt.agent.plugin.commands.command_mange import ApiCall
+
+
+class _FakeConnect:
+    db_type = "sqlite"
+
+    def run_to_df(self, command, fetch="all"):
+        return None
+
+
+class _FakeDbManage:
+    def get_connect(self, db_name):
+        return _FakeConnect()
+
+
+class _FakeExecutorFactory:
+    def __init__(self):
+        self.created = 0
+
+    def create(self):
+        self.created += 1
+        return object()
+
+
+class _FakeSystemApp:
+    def __init__(self, factory):
+        self.factory = factory
+
+    def get_component(self, name, component_type):
+        return self.factory
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(CFG, "LOCAL_DB_MANAGE", _FakeDbManage())
+    context = AgentContext(conv_id="test_conv", llm_provider=None)
+    context.resource_db = {"name": "test_db"}
+    return SQLAssistantAgent(memory=GptsMemory(), agent_context=context)
+
+
+def test_init_creates_api_call(agent):
+    assert isinstance(agent.api_call, ApiCall)
+
+
+def test_api_call_reset(agent):
+    api_call = agent.api_call
+    api_call.plugin_status_map["chart"] = object()
+    api_call.reset()
+    assert agent.api_call is api_call
+    assert api_call.plugin_status_map == {}
+
+
+def test_executor_resolved_once(agent, monkeypatch):
+    factory = _FakeExecutorFactory()
+    monkeypatch.setattr(CFG, "SYSTEM_APP", _FakeSystemApp(factory))
+    executor = agent.executor
+    assert agent.executor is executor
+    assert factory.created == 1
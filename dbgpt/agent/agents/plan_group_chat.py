@@ -1,8 +1,9 @@
 import logging
+import random
 import re
 import sys
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Union
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
 
 from dbgpt.core.interface.message import ModelMessageRoleType
 
@@ -14,8 +15,12 @@ from .base_agent import ConversableAgent
 
 logger = logging.getLogger(__name__)
 
+_VALID_SPEAKER_SELECTION_METHODS = frozenset(
+    ("auto", "manual", "random", "round_robin")
+)
 
-@dataclass
+
+@dataclass(slots=True)
 class PlanChat:
     """(In preview) A group chat class that contains the following data fields:
     - agents: a list of participating agents.
@@ -43,13 +48,52 @@ class PlanChat:
     func_call_filter: bool = True
     speaker_selection_method: str = "auto"
     allow_repeat_speaker: bool = True
-
-    _VALID_SPEAKER_SELECTION_METHODS = ["auto", "manual", "random", "round_robin"]
+    # Compiled mention regex per agent name, see `_mentioned_agents`
+    _mention_patterns: Dict[str, re.Pattern] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    # One alternation regex per candidate name set, None when it can't be used
+    _combined_mention_patterns: Dict[Tuple[str, ...], Optional[re.Pattern]] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    # Rendered `_participant_roles` per agent name tuple
+    _roles_cache: Dict[Tuple[str, ...], str] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    # Agent lookups by name, see `_index_agents`
+    _name_to_agent: Dict[str, Agent] = field(
+        default_factory=dict, init=False, repr=False
+    )
+    _name_to_index: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _agent_names: List[str] = field(default_factory=list, init=False, repr=False)
+
+    def __post_init__(self):
+        self._index_agents()
+
+    def _index_agents(self):
+        # The first agent wins on duplicated names, like `list.index` did
+        self._agent_names = [agent.name for agent in self.agents]
+        self._roles_cache = {}
+        self._name_to_agent = {}
+        self._name_to_index = {}
+        for i, agent in enumerate(self.agents):
+            self._name_to_agent.setdefault(agent.name, agent)
+            self._name_to_index.setdefault(agent.name, i)
+
+    def set_agents(self, agents: List[Agent]):
+        """Replace the agents of the group chat."""
+        self.agents = agents
+        self._index_agents()
 
     @property
     def agent_names(self) -> List[str]:
         """Return the names of the agents in the group chat."""
-        return [agent.name for agent in self.agents]
+        return self._agent_names
+
+    def _names_of(self, agents: List[Agent]) -> List[str]:
+        if agents is self.agents:
+            return self._agent_names
+        return [agent.name for agent in agents]
 
     def reset(self):
         """Reset the group chat."""
@@ -57,7 +101,10 @@ class PlanChat:
 
     def agent_by_name(self, name: str) -> Agent:
         """Returns the agent with a given name."""
-        return self.agents[self.agent_names.index(name)]
+        try:
+            return self._name_to_agent[name]
+        except KeyError:
+            raise ValueError(f"{name} is not in the group chat agents")
 
     # def select_speaker_msg(self, agents: List[Agent], task_context: str, models: Optional[List[dict]]):
     #     f"""Return the message for selecting the next speaker."""
@@ -71,7 +118,7 @@ class PlanChat:
         return f"""You are in a role play game. The following roles are available:
     {self._participant_roles(agents)}.
     Read the following conversation.
-    Then select the next role from {[agent.name for agent in agents]} to play. The role can be selected repeatedly.Only return the role."""
+    Then select the next role from {self._names_of(agents)} to play. The role can be selected repeatedly.Only return the role."""
 
     async def a_select_speaker(
         self,
@@ -81,24 +128,18 @@ class PlanChat:
         pre_allocated: str = None,
     ):
         """Select the next speaker."""
-        if (
-            self.speaker_selection_method.lower()
-            not in self._VALID_SPEAKER_SELECTION_METHODS
-        ):
+        method = self.speaker_selection_method.lower()
+        if method not in _VALID_SPEAKER_SELECTION_METHODS:
             raise ValueError(
                 f"GroupChat speaker_selection_method is set to '{self.speaker_selection_method}'. "
-                f"It should be one of {self._VALID_SPEAKER_SELECTION_METHODS} (case insensitive). "
+                f"It should be one of {sorted(_VALID_SPEAKER_SELECTION_METHODS)} (case insensitive). "
             )
 
         agents = self.agents
         n_agents = len(agents)
         # Warn if GroupChat is underpopulated
 
-        if (
-            n_agents <= 2
-            and self.speaker_selection_method.lower() != "round_robin"
-            and self.allow_repeat_speaker
-        ):
+        if n_agents <= 2 and method != "round_robin" and self.allow_repeat_speaker:
             logger.warning(
                 f"GroupChat is underpopulated with {n_agents} agents. "
                 "It is recommended to set speaker_selection_method to 'round_robin' or allow_repeat_speaker to False."
@@ -126,6 +167,15 @@ class PlanChat:
             logger.info(f"Preselect speakers:{pre_allocated}")
             name = pre_allocated
             model = None
+        elif not agents:
+            return self.next_agent(last_speaker, self.agents), None
+        elif len(agents) == 1:
+            # Nothing to choose from, skip the LLM call
+            return agents[0], None
+        elif method == "round_robin":
+            return self.next_agent(last_speaker, agents), None
+        elif method == "random":
+            return random.choice(agents), None
         else:
             # auto speaker selection
             selector.update_system_message(self.select_speaker_msg(agents))
@@ -136,7 +186,7 @@ class PlanChat:
                         "role": ModelMessageRoleType.HUMAN,
                         "content": f"""Read and understand the following task content and assign the appropriate role to complete the task.
                                     Task content: {now_plan_context}
-                                    select the role from: {[agent.name for agent in agents]},
+                                    select the role from: {self._names_of(agents)},
                                     Please only return the role, such as: {agents[0].name}""",
                     }
                 ]
@@ -168,22 +218,58 @@ class PlanChat:
         Returns: A dictionary mapping agent names to mention counts (to be included, at least one mention must occur)
         """
         mentions = dict()
+        # Pad the message to help with matching
+        padded_content = f" {message_content} "
+        combined = self._combined_mention_pattern(tuple(self._names_of(agents)))
+        if combined is not None:
+            for match in combined.finditer(padded_content):
+                name = match.group(1)
+                mentions[name] = mentions.get(name, 0) + 1
+            return mentions
+
         for agent in agents:
-            regex = (
-                r"(?<=\W)" + re.escape(agent.name) + r"(?=\W)"
-            )  # Finds agent mentions, taking word boundaries into account
-            count = len(
-                re.findall(regex, " " + message_content + " ")
-            )  # Pad the message to help with matching
+            pattern = self._mention_patterns.get(agent.name)
+            if pattern is None:
+                # Finds agent mentions, taking word boundaries into account
+                pattern = re.compile(r"(?<=\W)" + re.escape(agent.name) + r"(?=\W)")
+                self._mention_patterns[agent.name] = pattern
+            count = sum(1 for _ in pattern.finditer(padded_content))
             if count > 0:
                 mentions[agent.name] = count
         return mentions
 
+    def _combined_mention_pattern(self, names: Tuple[str, ...]) -> Optional[re.Pattern]:
+        """Return one regex matching any of the names, to scan the message once.
+
+        The match is a lookahead so that mentions sharing characters are all
+        counted, but only one alternative can match at a given position. When a
+        name is contained in another one (e.g. "Data" in "Data Analyst") None is
+        returned and the names are matched one by one.
+        """
+        if names in self._combined_mention_patterns:
+            return self._combined_mention_patterns[names]
+        pattern = None
+        if names and not any(a != b and a in b for a in names for b in names):
+            # Longest first, so a shorter alternative never shadows a longer one
+            alternatives = sorted(set(names), key=len, reverse=True)
+            pattern = re.compile(
+                r"(?<=\W)(?=("
+                + "|".join(re.escape(name) for name in alternatives)
+                + r")\W)"
+            )
+        self._combined_mention_patterns[names] = pattern
+        return pattern
+
     def _participant_roles(self, agents: List[Agent] = None) -> str:
         # Default to all agents registered
         if agents is None:
             agents = self.agents
 
+        key = tuple(self._names_of(agents))
+        participant_roles = self._roles_cache.get(key)
+        if participant_roles is not None:
+            return participant_roles
+
         roles = []
         for agent in agents:
             if agent.system_message.strip() == "":
@@ -191,18 +277,17 @@ class PlanChat:
                     f"The agent '{agent.name}' has an empty system_message, and may not work well with GroupChat."
                 )
             roles.append(f"{agent.name}: {agent.describe}")
-        return "\n".join(roles)
-
-    def agent_by_name(self, name: str) -> Agent:
-        """Returns the agent with a given name."""
-        return self.agents[self.agent_names.index(name)]
+        participant_roles = "\n".join(roles)
+        self._roles_cache[key] = participant_roles
+        return participant_roles
 
     def next_agent(self, agent: Agent, agents: List[Agent]) -> Agent:
         """Return the next agent in the list."""
+        # A last speaker outside the group (e.g. the user proxy) starts from the first
+        offset = self._name_to_index.get(agent.name, -1) + 1
         if agents == self.agents:
-            return agents[(self.agent_names.index(agent.name) + 1) % len(agents)]
+            return agents[offset % len(agents)]
         else:
-            offset = self.agent_names.index(agent.name) + 1
             for i in range(len(self.agents)):
                 if self.agents[(offset + i) % len(self.agents)] in agents:
                     return self.agents[(offset + i) % len(self.agents)]
@@ -262,21 +347,25 @@ class PlanChatManager(ConversableAgent):
     ):
         rely_prompt = ""
         speaker.reset_rely_message()
-        if now_plan.rely and len(now_plan.rely) > 0:
+        if now_plan.rely:
             rely_tasks_list = now_plan.rely.split(",")
             rely_tasks = self.memory.plans_memory.get_by_conv_id_and_num(
                 conv_id, rely_tasks_list
             )
             if rely_tasks:
                 rely_prompt = "Read the result data of the dependent steps in the above historical message to complete the current goal:"
+                rely_messages = []
                 for rely_task in rely_tasks:
-                    speaker.append_rely_message(
-                        {"content": rely_task.sub_task_content},
-                        ModelMessageRoleType.HUMAN,
+                    rely_messages.append(
+                        (
+                            {"content": rely_task.sub_task_content},
+                            ModelMessageRoleType.HUMAN,
+                        )
                     )
-                    speaker.append_rely_message(
-                        {"content": rely_task.result}, ModelMessageRoleType.AI
+                    rely_messages.append(
+                        ({"content": rely_task.result}, ModelMessageRoleType.AI)
                     )
+                speaker.extend_rely_messages(rely_messages)
         return rely_prompt
 
     async def a_verify_reply(
@@ -299,7 +388,14 @@ class PlanChatManager(ConversableAgent):
         final_message = None
 
         for i in range(groupchat.max_round):
-            plans = self.memory.plans_memory.get_by_conv_id(self.agent_context.conv_id)
+            # Only the pending plans are needed in a round, the full plan list is
+            # loaded just to tell "not planned yet" from "all plans done".
+            todo_plans = self.memory.plans_memory.get_todo_plans(
+                self.agent_context.conv_id
+            )
+            plans = todo_plans or self.memory.plans_memory.get_by_conv_id(
+                self.agent_context.conv_id
+            )
             if not plans or len(plans) <= 0:
                 ###Have no plan, generate a new plan TODO init plan use planmanger
                 await self.a_send(
@@ -323,11 +419,6 @@ class PlanChatManager(ConversableAgent):
                     if i > 10:
                         break
             else:
-                todo_plans = [
-                    plan
-                    for plan in plans
-                    if plan.state in [Status.TODO.value, Status.RETRYING.value]
-                ]
                 if not todo_plans or len(todo_plans) <= 0:
                     ### The plan has been fully executed and a success message is sent to the user.
                     # complete
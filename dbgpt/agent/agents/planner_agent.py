@@ -1,5 +1,7 @@
 from typing import Any, Callable, Dict, Optional, Tuple, Union
 
+from jsonschema import Draft7Validator, ValidationError
+
 from dbgpt._private.config import Config
 from dbgpt.agent.agents.plan_group_chat import PlanChat
 from dbgpt.agent.common.schema import Status
@@ -13,11 +15,28 @@ from .base_agent import ConversableAgent
 # TODO: remove global config
 CFG = Config()
 
+# The plan structure the planner prompt asks the LLM for
+_PLAN_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "required": ["serial_number", "content"],
+        "properties": {
+            "serial_number": {"type": ["string", "integer"]},
+            "agent": {"type": ["string", "null"]},
+            "content": {"type": "string"},
+            "rely": {"type": ["string", "integer", "null"]},
+            "resource": {"type": ["string", "null"]},
+        },
+    },
+}
+_PLAN_VALIDATOR = Draft7Validator(_PLAN_SCHEMA)
+
 
 class PlannerAgent(ConversableAgent):
     """Planner agent, realizing task goal planning decomposition through LLM"""
 
-    DEFAULT_SYSTEM_MESSAGE = """
+    DEFAULT_SYSTEM_MESSAGE_HEADER = """
     你是一个任务规划专家！您需要理解下面每个智能代理和他们的能力，却确保在没有用户帮助下，使用给出的资源，通过协调下面可用智能代理来回答用户问题。 
     请发挥你LLM的知识和理解能力，理解用户问题的意图和目标，生成一个可用智能代理协作的任务计划解决用户问题。
     
@@ -27,7 +46,9 @@ class PlannerAgent(ConversableAgent):
     可用智能代理:
         {agents}
 
-    *** 重要的提醒 ***
+"""
+    # The rest of the prompt has no placeholders, so it is kept out of str.format
+    DEFAULT_SYSTEM_MESSAGE_BODY = """    *** 重要的提醒 ***
     - 充分理解用户目标然后进行必要的步骤拆分，拆分需要保证逻辑顺序和精简，尽量把可以一起完成的内容合并再一个步骤，拆分后每个子任务步骤都将是一个需要智能代理独立完成的目标, 请确保每个子任务目标内容简洁明了
     - 请确保只使用上面提到的智能代理，并且可以只使用其中需要的部分，严格根据描述能力和限制分配给合适的步骤，每个智能代理都可以重复使用
     - 给子任务分配智能代理是需要考虑整体计划，确保和前后依赖步骤的关系，数据可以被传递使用
@@ -39,42 +60,44 @@ class PlannerAgent(ConversableAgent):
     具体任务计划的生成可参考如下例子:
     user:help me build a sales report summarizing our key metrics and trends
     assisant:[
-        {{
+        {
             "serial_number": "1",
             "agent": "DataScientist",
             "content": "Retrieve total sales, average sales, and number of transactions grouped by "product_category"'.",
             "rely": ""
-        }},
-        {{
+        },
+        {
             "serial_number": "2",
             "agent": "DataScientist",
             "content": "Retrieve monthly sales and transaction number trends.",
             "rely": ""
-        }},
-        {{
+        },
+        {
             "serial_number": "3",
             "agent": "DataScientist",
             "content": "Count the number of transactions with "pay_status" as "paid" among all transactions to retrieve the sales conversion rate.",
             "rely": ""
-        }},
-        {{
+        },
+        {
             "serial_number": "4",
             "agent": "Reporter",
             "content": "Integrate analytical data into the format required to build sales reports.",
             "rely": "1,2,3"
-        }}
+        }
     ]
     
     请一步步思考，并以如下json格式返回你的行动计划内容:
-    [{{
+    [{
         "serial_number":"0",
         "agent": "用来完成当前步骤的智能代理",
         "content": "当前步骤的任务内容，确保可以被智能代理执行",
         "rely":"当前任务执行依赖的其他任务serial_number, 如:1,2,3,  无依赖为空"
-    }}]
+    }]
     确保回答的json可以被Python代码的json.loads函数加载解析.
     """
 
+    DEFAULT_SYSTEM_MESSAGE = DEFAULT_SYSTEM_MESSAGE_HEADER + DEFAULT_SYSTEM_MESSAGE_BODY
+
     REPAIR_SYSTEM_MESSAGE = """
      您是规划专家!现在你需要利用你的专业知识，仔细检查已生成的计划,进行重新评估和分析，确保计划的每个步骤都是清晰完整的，可以被智能代理理解的，解决当前计划中遇到的问题！并按要求返回新的计划内容。
     """
@@ -131,7 +154,10 @@ class PlannerAgent(ConversableAgent):
 
     async def a_system_fill_param(self):
         params = self.build_param(self.agent_context)
-        self.update_system_message(self.DEFAULT_SYSTEM_MESSAGE.format(**params))
+        self.update_system_message(
+            self.DEFAULT_SYSTEM_MESSAGE_HEADER.format(**params)
+            + self.DEFAULT_SYSTEM_MESSAGE_BODY
+        )
 
     async def _a_planning(
         self,
@@ -153,35 +179,44 @@ class PlannerAgent(ConversableAgent):
             rensponse_succ = False
         else:
             try:
+                _PLAN_VALIDATOR.validate(json_objects[0])
+                conv_id = self.agent_context.conv_id
+                max_retry_times = self.agent_context.max_retry_round
+                todo_state = Status.TODO.value
                 for item in json_objects[0]:
-                    plan = GptsPlan(
-                        conv_id=self.agent_context.conv_id,
-                        sub_task_num=item.get("serial_number"),
-                        sub_task_content=item.get("content"),
+                    get = item.get
+                    content = get("content")
+                    plan_objects.append(
+                        GptsPlan(
+                            conv_id=conv_id,
+                            sub_task_num=get("serial_number"),
+                            sub_task_content=content,
+                            sub_task_title=content,
+                            sub_task_agent=get("agent"),
+                            resource_name=get("resource"),
+                            rely=get("rely"),
+                            retry_times=0,
+                            max_retry_times=max_retry_times,
+                            state=todo_state,
+                        )
                     )
-                    plan.resource_name = item.get("resource")
-                    plan.max_retry_times = self.agent_context.max_retry_round
-                    plan.sub_task_agent = item.get("agent")
-                    plan.sub_task_title = item.get("content")
-                    plan.rely = item.get("rely")
-                    plan.retry_times = 0
-                    plan.status = Status.TODO.value
-                    plan_objects.append(plan)
+            except ValidationError as e:
+                fail_reason += f"Return json structure error and cannot be converted to a usable plan，{e.message}"
+                rensponse_succ = False
             except Exception as e:
                 fail_reason += f"Return json structure error and cannot be converted to a usable plan，{str(e)}"
                 rensponse_succ = False
 
         if rensponse_succ:
             if len(plan_objects) > 0:
-                ### Delete the old plan every time before saving it
-                self.memory.plans_memory.remove_by_conv_id(self.agent_context.conv_id)
-                self.memory.plans_memory.batch_save(plan_objects)
+                ### Replace the old plan every time
+                self.memory.plans_memory.replace_by_conv_id(
+                    self.agent_context.conv_id, plan_objects
+                )
 
             content = "\n".join(
-                [
-                    "{},{}".format(index + 1, item.get("content"))
-                    for index, item in enumerate(json_objects[0])
-                ]
+                f"{index + 1},{plan.sub_task_content}"
+                for index, plan in enumerate(plan_objects)
             )
         else:
             content = fail_reason
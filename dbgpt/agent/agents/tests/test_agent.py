@@ -0,0 +1,48 @@
+import dataclasses
+
+import pytest
+
+from dbgpt.agent.agents.agent import AgentContext, AgentResource
+from dbgpt.core.interface.llm import ModelMetadata
+
+
+def _resource(name: str) -> AgentResource:
+    return AgentResource(type="database", name=name, introduce=f"{name} intro")
+
+
+def test_agent_resource_to_dict():
+    resource = _resource("db1")
+    assert resource.to_dict() == dataclasses.asdict(resource)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {
+            "gpts_name": "gpts",
+            "resource_db": _resource("db1"),
+            "resource_knowledge": _resource("kb1"),
+            "llm_models": [ModelMetadata(model="model1"), "model2"],
+            "model_priority": {"default": ["model1"], "Coder": ["model2"]},
+            "agents": ["Coder", "Reporter"],
+            "max_chat_round": 5,
+            "temperature": 0.1,
+            "allow_format_str_template": True,
+        },
+    ],
+)
+def test_agent_context_to_dict(kwargs):
+    context = AgentContext(conv_id="conv1", llm_provider=None, **kwargs)
+    result = context.to_dict()
+    assert result == dataclasses.asdict(context)
+    assert list(result) == [field.name for field in dataclasses.fields(context)]
+
+
+def test_agent_context_to_dict_does_not_share_nested_dataclasses():
+    context = AgentContext(
+        conv_id="conv1", llm_provider=None, resource_db=_resource("db1")
+    )
+    result = context.to_dict()
+    result["resource_db"]["name"] = "changed"
+    assert context.resource_db.name == "db1"
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+from dbgpt.agent.agents.agent import Agent
+from dbgpt.agent.agents.plan_group_chat import PlanChat
+from dbgpt.agent.memory.gpts_memory import GptsMemory
+
+
+def _agents(*names):
+    memory = GptsMemory()
+    return [Agent(name, memory, f"{name} describe") for name in names]
+
+
+@pytest.fixture
+def plan_chat():
+    return PlanChat(agents=_agents("Planner", "Coder", "Reporter"), messages=[])
+
+
+def test_next_agent(plan_chat):
+    planner, coder, reporter = plan_chat.agents
+    assert plan_chat.next_agent(planner, plan_chat.agents) is coder
+    assert plan_chat.next_agent(reporter, plan_chat.agents) is planner
+    assert plan_chat.next_agent(planner, [planner, reporter]) is reporter
+
+
+def test_next_agent_with_non_member_speaker(plan_chat):
+    (user_proxy,) = _agents("User")
+    planner, coder, reporter = plan_chat.agents
+    assert plan_chat.next_agent(user_proxy, plan_chat.agents) is planner
+    assert plan_chat.next_agent(user_proxy, [coder, reporter]) is coder
+
+
+@pytest.mark.asyncio
+async def test_round_robin_from_non_member_speaker():
+    plan_chat = PlanChat(
+        agents=_agents("Planner", "Coder", "Reporter"),
+        messages=[],
+        speaker_selection_method="round_robin",
+    )
+    (user_proxy,) = _agents("User")
+    speaker, model = await plan_chat.a_select_speaker(user_proxy, None, "task")
+    assert speaker is plan_chat.agents[0]
+    assert model is None
+
+
+def _count_mentions_per_name(message_content, names):
+    # The original one-regex-per-name counting
+    mentions = {}
+    for name in names:
+        count = len(
+            re.findall(r"(?<=\W)" + re.escape(name) + r"(?=\W)", f" {message_content} ")
+        )
+        if count > 0:
+            mentions[name] = count
+    return mentions
+
+
+@pytest.mark.parametrize(
+    "names, message",
+    [
+        (("Planner", "Coder", "Reporter"), "Coder, then Reporter. Coder again"),
+        (("Coder", "Coder2"), "Coder2 should help Coder, not Coder3"),
+        (("Coder2", "Coder"), "Coder Coder2 Coder2"),
+        (("Data", "Data Analyst"), "Data Analyst reads the Data"),
+        (("A B", "B C"), "A B C and B C"),
+        (("Ab", "b.c"), "Ab.c b.c"),
+        (("Coder",), "nobody is mentioned"),
+    ],
+)
+def test_mention_counts_match_per_name_counting(names, message):
+    plan_chat = PlanChat(agents=_agents(*names), messages=[])
+    assert plan_chat._mentioned_agents(
+        message, plan_chat.agents
+    ) == _count_mentions_per_name(message, names)
@@ -11,7 +11,7 @@ class ApiTagType(Enum):
     API_CALL = "dbgpt_call"
 
 
-class Status(Enum):
+class Status(str, Enum):
     TODO = "todo"
     RUNNING = "running"
     WAITING = "waiting"
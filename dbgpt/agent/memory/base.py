@@ -176,6 +176,19 @@ class GptsPlansMemory(ABC):
 
         """
 
+    def replace_by_conv_id(self, conv_id: str, plans: List[GptsPlan]):
+        """
+        Replace all planning steps of a conversation with new ones
+        Args:
+            conv_id: conversation id
+            plans: panner generate plans info
+
+        Returns:
+            None
+        """
+        self.remove_by_conv_id(conv_id)
+        self.batch_save(plans)
+
 
 class GptsMessageMemory(ABC):
     def append(self, message: GptsMessage):
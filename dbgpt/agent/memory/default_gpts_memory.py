@@ -1,7 +1,6 @@
-from dataclasses import fields
-from typing import List, Optional
-
-import pandas as pd
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
 
 from dbgpt.agent.common.schema import Status
 
@@ -10,45 +9,39 @@ from .base import GptsMessage, GptsMessageMemory, GptsPlan, GptsPlansMemory
 
 class DefaultGptsPlansMemory(GptsPlansMemory):
     def __init__(self):
-        self.df = pd.DataFrame(columns=[field.name for field in fields(GptsPlan)])
+        # conv_id -> sub_task_num -> plan, in insertion order
+        self.plans: Dict[str, Dict[int, GptsPlan]] = {}
 
     def batch_save(self, plans: list[GptsPlan]):
-        new_rows = pd.DataFrame([item.to_dict() for item in plans])
-        self.df = pd.concat([self.df, new_rows], ignore_index=True)
+        for plan in plans:
+            self.plans.setdefault(plan.conv_id, {})[plan.sub_task_num] = replace(plan)
 
     def get_by_conv_id(self, conv_id: str) -> List[GptsPlan]:
-        result = self.df.query(f"conv_id==@conv_id")
-        plans = []
-        for row in result.itertuples(index=False, name=None):
-            row_dict = dict(zip(self.df.columns, row))
-            plans.append(GptsPlan.from_dict(row_dict))
-        return plans
+        return [replace(plan) for plan in self.plans.get(conv_id, {}).values()]
 
     def get_by_conv_id_and_num(
         self, conv_id: str, task_nums: List[int]
     ) -> List[GptsPlan]:
-        result = self.df.query(f"conv_id==@conv_id and sub_task_num in @task_nums")
-        plans = []
-        for row in result.itertuples(index=False, name=None):
-            row_dict = dict(zip(self.df.columns, row))
-            plans.append(GptsPlan.from_dict(row_dict))
-        return plans
+        task_nums = set(task_nums)
+        return [
+            replace(plan)
+            for plan in self.plans.get(conv_id, {}).values()
+            if plan.sub_task_num in task_nums
+        ]
 
     def get_todo_plans(self, conv_id: str) -> List[GptsPlan]:
-        todo_states = [Status.TODO.value, Status.RETRYING.value]
-        result = self.df.query(f"conv_id==@conv_id and state in @todo_states")
-        plans = []
-        for row in result.itertuples(index=False, name=None):
-            row_dict = dict(zip(self.df.columns, row))
-            plans.append(GptsPlan.from_dict(row_dict))
-        return plans
+        todo_states = (Status.TODO.value, Status.RETRYING.value)
+        return [
+            replace(plan)
+            for plan in self.plans.get(conv_id, {}).values()
+            if plan.state in todo_states
+        ]
 
     def complete_task(self, conv_id: str, task_num: int, result: str):
-        condition = (self.df["conv_id"] == conv_id) & (
-            self.df["sub_task_num"] == task_num
-        )
-        self.df.loc[condition, "state"] = Status.COMPLETE.value
-        self.df.loc[condition, "result"] = result
+        plan = self.plans.get(conv_id, {}).get(task_num)
+        if plan:
+            plan.state = Status.COMPLETE.value
+            plan.result = result
 
     def update_task(
         self,
@@ -60,39 +53,50 @@ class DefaultGptsPlansMemory(GptsPlansMemory):
         model=None,
         result: str = None,
     ):
-        condition = (self.df["conv_id"] == conv_id) & (
-            self.df["sub_task_num"] == task_num
-        )
-        self.df.loc[condition, "state"] = state
-        self.df.loc[condition, "retry_times"] = retry_times
-        self.df.loc[condition, "result"] = result
+        plan = self.plans.get(conv_id, {}).get(task_num)
+        if not plan:
+            return
+        plan.state = state
+        plan.retry_times = retry_times
+        plan.result = result
 
         if agent:
-            self.df.loc[condition, "sub_task_agent"] = agent
+            plan.sub_task_agent = agent
 
         if model:
-            self.df.loc[condition, "agent_model"] = model
+            plan.agent_model = model
 
     def remove_by_conv_id(self, conv_id: str):
-        self.df.drop(self.df[self.df["conv_id"] == conv_id].index, inplace=True)
+        self.plans.pop(conv_id, None)
 
 
 class DefaultGptsMessageMemory(GptsMessageMemory):
     def __init__(self):
-        self.df = pd.DataFrame(columns=[field.name for field in fields(GptsMessage)])
+        self.messages: List[GptsMessage] = []
+        self._by_conv: Dict[str, List[GptsMessage]] = defaultdict(list)
+        # (conv_id, agent) -> messages sent or received by the agent
+        self._by_agent: Dict[Tuple[str, str], List[GptsMessage]] = defaultdict(list)
+        # (conv_id, {sender, receiver}) -> messages exchanged by the pair
+        self._by_pair: Dict[Tuple[str, frozenset], List[GptsMessage]] = defaultdict(
+            list
+        )
 
     def append(self, message: GptsMessage):
-        self.df.loc[len(self.df)] = message.to_dict()
+        message = replace(message)
+        conv_id = message.conv_id
+        self.messages.append(message)
+        self._by_conv[conv_id].append(message)
+        self._by_agent[(conv_id, message.sender)].append(message)
+        if message.receiver != message.sender:
+            self._by_agent[(conv_id, message.receiver)].append(message)
+        self._by_pair[(conv_id, frozenset((message.sender, message.receiver)))].append(
+            message
+        )
 
     def get_by_agent(self, conv_id: str, agent: str) -> Optional[List[GptsMessage]]:
-        result = self.df.query(
-            f"conv_id==@conv_id and (sender==@agent or receiver==@agent)"
-        )
-        messages = []
-        for row in result.itertuples(index=False, name=None):
-            row_dict = dict(zip(self.df.columns, row))
-            messages.append(GptsMessage.from_dict(row_dict))
-        return messages
+        return [
+            replace(message) for message in self._by_agent.get((conv_id, agent), [])
+        ]
 
     def get_between_agents(
         self,
@@ -101,19 +105,12 @@ class DefaultGptsMessageMemory(GptsMessageMemory):
         agent2: str,
         current_gogal: Optional[str] = None,
     ) -> Optional[List[GptsMessage]]:
-        result = self.df.query(
-            f"conv_id==@conv_id and ((sender==@agent1 and receiver==@agent2) or (sender==@agent2 and receiver==@agent1)) and current_gogal==@current_gogal"
-        )
-        messages = []
-        for row in result.itertuples(index=False, name=None):
-            row_dict = dict(zip(self.df.columns, row))
-            messages.append(GptsMessage.from_dict(row_dict))
-        return messages
+        messages = self._by_pair.get((conv_id, frozenset((agent1, agent2))), [])
+        return [
+            replace(message)
+            for message in messages
+            if not current_gogal or message.current_gogal == current_gogal
+        ]
 
     def get_by_conv_id(self, conv_id: str) -> Optional[List[GptsMessage]]:
-        result = self.df.query(f"conv_id==@conv_id")
-        messages = []
-        for row in result.itertuples(index=False, name=None):
-            row_dict = dict(zip(self.df.columns, row))
-            messages.append(GptsMessage.from_dict(row_dict))
-        return messages
+        return [replace(message) for message in self._by_conv.get(conv_id, [])]
@@ -0,0 +1,157 @@
+import pytest
+
+from dbgpt.agent.common.schema import Status
+
+from ..base import GptsMessage, GptsPlan
+from ..default_gpts_memory import DefaultGptsMessageMemory, DefaultGptsPlansMemory
+
+
+def _plan(conv_id: str, num: int, state: str = Status.TODO.value) -> GptsPlan:
+    return GptsPlan(
+        conv_id=conv_id,
+        sub_task_num=num,
+        sub_task_content=f"content {num}",
+        sub_task_agent="Coder",
+        state=state,
+    )
+
+
+@pytest.fixture
+def plans_memory():
+    memory = DefaultGptsPlansMemory()
+    memory.batch_save(
+        [
+            _plan("conv1", 1),
+            _plan("conv1", 2, Status.RETRYING.value),
+            _plan("conv1", 3, Status.COMPLETE.value),
+            _plan("conv2", 1),
+        ]
+    )
+    return memory
+
+
+def test_plans_get_by_conv_id(plans_memory):
+    assert [p.sub_task_num for p in plans_memory.get_by_conv_id("conv1")] == [1, 2, 3]
+    assert [p.sub_task_num for p in plans_memory.get_by_conv_id("conv2")] == [1]
+    assert plans_memory.get_by_conv_id("missing") == []
+
+
+def test_plans_get_by_conv_id_and_num(plans_memory):
+    plans = plans_memory.get_by_conv_id_and_num("conv1", [3, 1, 9])
+    assert [p.sub_task_num for p in plans] == [1, 3]
+
+
+def test_plans_get_todo_plans(plans_memory):
+    assert [p.sub_task_num for p in plans_memory.get_todo_plans("conv1")] == [1, 2]
+
+
+def test_plans_batch_save_replaces_same_task(plans_memory):
+    plans_memory.batch_save([_plan("conv1", 2, Status.COMPLETE.value)])
+    plans = plans_memory.get_by_conv_id("conv1")
+    assert [(p.sub_task_num, p.state) for p in plans] == [
+        (1, Status.TODO.value),
+        (2, Status.COMPLETE.value),
+        (3, Status.COMPLETE.value),
+    ]
+
+
+def test_plans_complete_and_update_task(plans_memory):
+    plans_memory.complete_task("conv1", 1, "done")
+    plans_memory.update_task("conv1", 2, Status.FAILED.value, 3, agent="", model="m")
+    plans_memory.complete_task("conv1", 9, "ignored")
+    first, second, _ = plans_memory.get_by_conv_id("conv1")
+    assert (first.state, first.result) == (Status.COMPLETE.value, "done")
+    assert (second.state, second.retry_times) == (Status.FAILED.value, 3)
+    assert (second.sub_task_agent, second.agent_model) == ("Coder", "m")
+    # Other conversations are left alone
+    assert plans_memory.get_by_conv_id("conv2")[0].state == Status.TODO.value
+
+
+def test_plans_returned_are_copies(plans_memory):
+    plan = _plan("conv3", 1)
+    plans_memory.batch_save([plan])
+    plan.state = Status.COMPLETE.value
+    plans_memory.get_by_conv_id("conv3")[0].state = Status.FAILED.value
+    assert plans_memory.get_by_conv_id("conv3")[0].state == Status.TODO.value
+
+
+def test_plans_remove_by_conv_id(plans_memory):
+    plans_memory.remove_by_conv_id("conv1")
+    plans_memory.remove_by_conv_id("missing")
+    assert plans_memory.get_by_conv_id("conv1") == []
+    assert len(plans_memory.get_by_conv_id("conv2")) == 1
+
+
+def _message(
+    sender: str, receiver: str, rounds: int, conv_id: str = "conv1", goal=None
+):
+    return GptsMessage(
+        conv_id=conv_id,
+        sender=sender,
+        receiver=receiver,
+        role="assistant",
+        content=f"{sender} to {receiver}",
+        rounds=rounds,
+        current_gogal=goal,
+    )
+
+
+@pytest.fixture
+def message_memory():
+    memory = DefaultGptsMessageMemory()
+    for message in [
+        _message("Planner", "Coder", 1, goal="goal1"),
+        _message("Coder", "Planner", 2, goal="goal1"),
+        _message("Coder", "Coder", 3, goal="goal2"),
+        _message("Coder", "Reporter", 4, goal="goal2"),
+        _message("Planner", "Coder", 1, conv_id="conv2"),
+    ]:
+        memory.append(message)
+    return memory
+
+
+def _rounds(messages):
+    return [message.rounds for message in messages]
+
+
+def test_messages_get_by_conv_id(message_memory):
+    assert _rounds(message_memory.get_by_conv_id("conv1")) == [1, 2, 3, 4]
+    assert _rounds(message_memory.get_by_conv_id("conv2")) == [1]
+    assert message_memory.get_by_conv_id("missing") == []
+
+
+def test_messages_get_by_agent(message_memory):
+    assert _rounds(message_memory.get_by_agent("conv1", "Planner")) == [1, 2]
+    # A message the agent sent to itself is returned once
+    assert _rounds(message_memory.get_by_agent("conv1", "Coder")) == [1, 2, 3, 4]
+    assert _rounds(message_memory.get_by_agent("conv1", "Reporter")) == [4]
+    assert message_memory.get_by_agent("conv1", "missing") == []
+
+
+def test_messages_get_between_agents(message_memory):
+    between = message_memory.get_between_agents
+    assert _rounds(between("conv1", "Planner", "Coder")) == [1, 2]
+    assert _rounds(between("conv1", "Coder", "Planner")) == [1, 2]
+    assert _rounds(between("conv1", "Coder", "Coder")) == [3]
+    assert _rounds(between("conv2", "Coder", "Planner")) == [1]
+    assert between("conv1", "Planner", "Reporter") == []
+
+
+def test_messages_get_between_agents_filters_goal(message_memory):
+    between = message_memory.get_between_agents
+    assert _rounds(between("conv1", "Coder", "Planner", "goal1")) == [1, 2]
+    assert between("conv1", "Coder", "Planner", "goal2") == []
+    # An empty goal does not filter
+    assert _rounds(between("conv1", "Coder", "Reporter", "")) == [4]
+
+
+def test_messages_returned_are_copies(message_memory):
+    message_memory.get_by_agent("conv1", "Planner")[0].content = "changed"
+    message = _message("Planner", "Coder", 5)
+    message_memory.append(message)
+    message.content = "changed"
+    for messages in (
+        message_memory.get_by_conv_id("conv1"),
+        message_memory.get_between_agents("conv1", "Planner", "Coder"),
+    ):
+        assert "changed" not in [m.content for m in messages]
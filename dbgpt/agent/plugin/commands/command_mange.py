@@ -214,6 +214,11 @@ class ApiCall:
         self.start_time = datetime.now().timestamp() * 1000
         self.backend_rendering: bool = False
 
+    def reset(self):
+        """Forget the api calls parsed so far, so the instance can be reused."""
+        self.plugin_status_map = {}
+        self.start_time = datetime.now().timestamp() * 1000
+
     def __repr__(self):
         return f"ApiCall(name={self.name}, status={self.status}, args={self.args})"
 
@@ -578,6 +583,7 @@ class ApiCall:
             return result
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def default_chart_type_promot() -> str:
         """this function is moved from excel_analyze/chat.py,and used by subclass.
         Returns:
@@ -49,11 +49,11 @@ async def get_editor_tables(
     db_conn = CFG.LOCAL_DB_MANAGE.get_connect(db_name)
     tables = db_conn.get_table_names()
     db_node: DataNode = DataNode(title=db_name, key=db_name, type="db")
+    tables_fields = db_conn.get_fields_bulk(list(tables))
     for table in tables:
         table_node: DataNode = DataNode(title=table, key=table, type="table")
         db_node.children.append(table_node)
-        fields = db_conn.get_fields(table)
-        for field in fields:
+        for field in tables_fields[table]:
             table_node.children.append(
                 DataNode(
                     title=field[0],
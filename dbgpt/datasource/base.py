@@ -118,6 +118,10 @@ class BaseConnect(ABC):
         """Get column fields about specified table."""
         pass
 
+    def get_fields_bulk(self, table_names: List[str]) -> Dict[str, List]:
+        """Get column fields about specified tables, keyed by table name."""
+        return {table_name: self.get_fields(table_name) for table_name in table_names}
+
     def get_simple_fields(self, table_name):
         """Get column fields about specified table."""
         return self.get_fields(table_name)
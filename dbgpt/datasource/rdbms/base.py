@@ -514,8 +514,7 @@ class RDBMSDatabase(BaseConnect):
                 )
             )
         )
-        fields = cursor.fetchall()
-        return [(field[0], field[1], field[2], field[3], field[4]) for field in fields]
+        return [(field[0], field[1], field[2], field[3], field[4]) for field in cursor]
 
     def get_simple_fields(self, table_name):
         """Get column fields about specified table."""
@@ -560,10 +559,7 @@ class RDBMSDatabase(BaseConnect):
                 )
             )
         )
-        table_comments = cursor.fetchall()
-        return [
-            (table_comment[0], table_comment[1]) for table_comment in table_comments
-        ]
+        return [(table_comment[0], table_comment[1]) for table_comment in cursor]
 
     def get_table_comment(self, table_name: str) -> Dict:
         """Get table comments.
@@ -585,10 +581,7 @@ class RDBMSDatabase(BaseConnect):
                 )
             )
         )
-        column_comments = cursor.fetchall()
-        return [
-            (column_comment[0], column_comment[1]) for column_comment in column_comments
-        ]
+        return [(column_comment[0], column_comment[1]) for column_comment in cursor]
 
     def get_database_list(self):
         session = self._db_sessions()
@@ -1,13 +1,21 @@
 import re
+import threading
+from functools import partial
 import sqlparse
 from typing import List, Optional, Any, Iterable, Dict
-from sqlalchemy import text
+from cachetools import TTLCache, cachedmethod
+from cachetools.keys import hashkey
 from dbgpt.datasource.rdbms.base import RDBMSDatabase
 from dbgpt.storage.schema import DBType
 from sqlalchemy import (
     MetaData,
 )
 
+# Engine clauses stripped from SHOW CREATE TABLE output
+_ENGINE_RE = re.compile(r"\s*ENGINE\s*=\s*MergeTree\s*", re.IGNORECASE)
+_CHARSET_RE = re.compile(r"\s*DEFAULT\s*CHARSET\s*=\s*\w+\s*", re.IGNORECASE)
+_SETTINGS_RE = re.compile(r"\s*SETTINGS\s*\s*\w+\s*", re.IGNORECASE)
+
 
 class ClickhouseConnect(RDBMSDatabase):
     """Connect Clickhouse Database fetch MetaData
@@ -39,6 +47,9 @@ class ClickhouseConnect(RDBMSDatabase):
         self._sample_rows_in_table_info = set()
 
         self._metadata = MetaData()
+        # Schema lookups repeat for the same tables while building prompts
+        self._schema_cache = TTLCache(maxsize=512, ttl=60)
+        self._schema_cache_lock = threading.Lock()
 
     @classmethod
     def from_uri_db(
@@ -93,10 +104,13 @@ class ClickhouseConnect(RDBMSDatabase):
         """
         session = self.client
 
-        _query_sql = f"""
-                    SELECT name AS table, primary_key, from system.tables where database ='{self.client.database}' and table = '{table_name}'
+        _query_sql = """
+                    SELECT name AS table, primary_key, from system.tables where database = {database:String} and table = {table_name:String}
                 """
-        with session.query_row_block_stream(_query_sql) as stream:
+        with session.query_row_block_stream(
+            _query_sql,
+            parameters={"database": self.client.database, "table_name": table_name},
+        ) as stream:
             indexes = [block for block in stream]
             return [
                 {"name": "primary_key", "column_names": column_names.split(",")}
@@ -120,16 +134,21 @@ class ClickhouseConnect(RDBMSDatabase):
         # TODO:
         pass
 
+    @cachedmethod(
+        lambda self: self._schema_cache,
+        key=partial(hashkey, "show_create_table"),
+        lock=lambda self: self._schema_cache_lock,
+    )
     def get_show_create_table(self, table_name):
         """Get table show create table about specified table."""
-        result = self.client.command(text(f"SHOW CREATE TABLE  {table_name}"))
-
-        ans = result
-        ans = re.sub(r"\s*ENGINE\s*=\s*MergeTree\s*", " ", ans, flags=re.IGNORECASE)
-        ans = re.sub(
-            r"\s*DEFAULT\s*CHARSET\s*=\s*\w+\s*", " ", ans, flags=re.IGNORECASE
+        result = self.client.command(
+            "SHOW CREATE TABLE {table_name:Identifier}",
+            parameters={"table_name": table_name},
         )
-        ans = re.sub(r"\s*SETTINGS\s*\s*\w+\s*", " ", ans, flags=re.IGNORECASE)
+
+        ans = _ENGINE_RE.sub(" ", result)
+        ans = _CHARSET_RE.sub(" ", ans)
+        ans = _SETTINGS_RE.sub(" ", ans)
         return ans
 
     def get_columns(self, table_name: str) -> List[Dict]:
@@ -143,21 +162,39 @@ class ClickhouseConnect(RDBMSDatabase):
         fields = self.get_fields(table_name)
         return [
             {"name": name, "comment": comment, "type": column_type}
-            for name, column_type, _, _, comment in fields[0]
+            for name, column_type, _, _, comment in fields
         ]
 
+    @cachedmethod(
+        lambda self: self._schema_cache,
+        key=partial(hashkey, "fields"),
+        lock=lambda self: self._schema_cache_lock,
+    )
     def get_fields(self, table_name):
-        """Get column fields about specified table."""
+        """Get column fields about specified table.
+
+        Returns:
+            List of (name, type, default_expression, is_in_primary_key, comment)
+        """
+        return self.get_fields_bulk([table_name])[table_name]
+
+    def get_fields_bulk(self, table_names: List[str]) -> Dict[str, List]:
+        """Get column fields about specified tables with a single query."""
+        if not table_names:
+            return {}
         session = self.client
 
-        _query_sql = f"""
-            SELECT name, type, default_expression, is_in_primary_key, comment  from system.columns where table='{table_name}'
-        """.format(
-            table_name
-        )
-        with session.query_row_block_stream(_query_sql) as stream:
-            fields = [block for block in stream]
-            return fields
+        _query_sql = """
+            SELECT table, name, type, default_expression, is_in_primary_key, comment  from system.columns where database = currentDatabase() and table in {table_names:Array(String)}
+        """
+        fields = {table_name: [] for table_name in table_names}
+        with session.query_row_block_stream(
+            _query_sql, parameters={"table_names": list(table_names)}
+        ) as stream:
+            for block in stream:
+                for table_name, *field in block:
+                    fields[table_name].append(tuple(field))
+        return fields
 
     def get_users(self):
         return []
@@ -206,6 +243,9 @@ class ClickhouseConnect(RDBMSDatabase):
             print(f"DDL execution determines whether to enable through configuration ")
 
             cursor = self.client.command(command)
+            # cachetools caches are not thread safe, use the cachedmethod lock
+            with self._schema_cache_lock:
+                self._schema_cache.clear()
 
             if cursor.written_rows:
                 result = cursor.result_rows
@@ -221,6 +261,21 @@ class ClickhouseConnect(RDBMSDatabase):
             else:
                 return self.get_simple_fields(table_name)
 
+    def run_to_df(self, command: str, fetch: str = "all"):
+        """Run a SELECT straight into a DataFrame.
+
+        query_df decodes the result by column, instead of building Python rows
+        first and converting them afterwards.
+        """
+        if not command:
+            return super().run_to_df(command, fetch)
+        _, ttype, sql_type, _ = self.__sql_parse(command)
+        if ttype != sqlparse.tokens.DML or sql_type != "SELECT":
+            return super().run_to_df(command, fetch)
+        print(f"Query[{command}]")
+        df = self.client.query_df(command)
+        return df.head(1) if fetch == "one" else df
+
     def get_simple_fields(self, table_name):
         """Get column fields about specified table."""
         return self._query(f"SHOW COLUMNS FROM {table_name}")
@@ -228,15 +283,20 @@ class ClickhouseConnect(RDBMSDatabase):
     def get_current_db_name(self):
         return self.client.database
 
+    @cachedmethod(
+        lambda self: self._schema_cache,
+        key=partial(hashkey, "table_comments"),
+        lock=lambda self: self._schema_cache_lock,
+    )
     def get_table_comments(self, db_name: str):
         session = self.client
 
-        _query_sql = f"""
-                SELECT table, comment FROM system.tables WHERE database = '{db_name}'""".format(
-            db_name
-        )
+        _query_sql = """
+                SELECT table, comment FROM system.tables WHERE database = {db_name:String}"""
 
-        with session.query_row_block_stream(_query_sql) as stream:
+        with session.query_row_block_stream(
+            _query_sql, parameters={"db_name": db_name}
+        ) as stream:
             table_comments = [row for block in stream for row in block]
             return table_comments
 
@@ -249,24 +309,25 @@ class ClickhouseConnect(RDBMSDatabase):
         """
         session = self.client
 
-        _query_sql = f"""
-                SELECT table, comment FROM system.tables WHERE database = '{self.client.database}'and table = '{table_name}'""".format(
-            self.client.database
-        )
+        _query_sql = """
+                SELECT table, comment FROM system.tables WHERE database = {database:String} and table = {table_name:String}"""
 
-        with session.query_row_block_stream(_query_sql) as stream:
+        with session.query_row_block_stream(
+            _query_sql,
+            parameters={"database": self.client.database, "table_name": table_name},
+        ) as stream:
             table_comments = [row for block in stream for row in block]
             return [{"text": comment} for table_name, comment in table_comments][0]
 
     def get_column_comments(self, db_name, table_name):
         session = self.client
-        _query_sql = f"""
-            select name column, comment from  system.columns where database='{db_name}' and table='{table_name}'
-        """.format(
-            db_name, table_name
-        )
+        _query_sql = """
+            select name column, comment from  system.columns where database = {db_name:String} and table = {table_name:String}
+        """
 
-        with session.query_row_block_stream(_query_sql) as stream:
+        with session.query_row_block_stream(
+            _query_sql, parameters={"db_name": db_name, "table_name": table_name}
+        ) as stream:
             column_comments = [row for block in stream for row in block]
             return column_comments
 
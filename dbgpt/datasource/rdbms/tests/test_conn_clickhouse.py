@@ -0,0 +1,72 @@
+"""
+Run unit test with command: pytest dbgpt/datasource/rdbms/tests/test_conn_clickhouse.py
+"""
+from contextlib import contextmanager
+
+import pytest
+
+from dbgpt.datasource.rdbms.conn_clickhouse import ClickhouseConnect
+
+# Rows of system.columns in the current database:
+# (table, name, type, default_expression, is_in_primary_key, comment)
+_COLUMNS = [
+    ("user", "id", "UInt64", "", 1, "user id"),
+    ("user", "name", "String", "", 0, "user name"),
+    ("order", "id", "UInt64", "", 1, "order id"),
+]
+
+
+class _FakeClient:
+    database = "test_db"
+
+    def __init__(self):
+        self.queries = []
+
+    @contextmanager
+    def query_row_block_stream(self, query, parameters=None):
+        self.queries.append((query, parameters))
+        tables = parameters["table_names"]
+        rows = [row for row in _COLUMNS if row[0] in tables]
+        # Two blocks, like a stream split by the server
+        yield [rows[:1], rows[1:]]
+
+
+@pytest.fixture
+def db():
+    return ClickhouseConnect(_FakeClient())
+
+
+def test_get_fields_bulk(db):
+    assert db.get_fields_bulk(["user", "order", "missing"]) == {
+        "user": [
+            ("id", "UInt64", "", 1, "user id"),
+            ("name", "String", "", 0, "user name"),
+        ],
+        "order": [("id", "UInt64", "", 1, "order id")],
+        "missing": [],
+    }
+    assert len(db.client.queries) == 1
+    query, parameters = db.client.queries[0]
+    assert "database = currentDatabase()" in query
+    assert parameters == {"table_names": ["user", "order", "missing"]}
+
+
+def test_get_fields_bulk_empty(db):
+    assert db.get_fields_bulk([]) == {}
+    assert db.client.queries == []
+
+
+def test_get_fields_matches_bulk(db):
+    assert db.get_fields("user") == db.get_fields_bulk(["user"])["user"]
+
+
+def test_get_fields_is_cached(db):
+    db.get_fields("user")
+    db.get_fields("user")
+    assert len(db.client.queries) == 1
+
+
+def test_get_columns(db):
+    assert db.get_columns("order") == [
+        {"name": "id", "comment": "order id", "type": "UInt64"}
+    ]
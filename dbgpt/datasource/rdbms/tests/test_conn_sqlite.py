@@ -140,3 +140,12 @@ def test_db_dir_exist_dir():
         db = SQLiteConnect.from_file_path(file_path)
         assert os.path.exists(existing_dir) == True
         assert list(db.get_table_names()) == []
+
+
+def test_get_fields_bulk(db):
+    db.run("CREATE TABLE test (id INTEGER PRIMARY KEY);")
+    db.run("CREATE TABLE test2 (name TEXT);")
+    assert db.get_fields_bulk(["test", "test2"]) == {
+        "test": db.get_fields("test"),
+        "test2": db.get_fields("test2"),
+    }
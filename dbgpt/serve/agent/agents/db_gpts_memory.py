@@ -73,6 +73,11 @@ class MetaDbGptsPlansMemory(GptsPlansMemory):
     def remove_by_conv_id(self, conv_id: str):
         self.gpts_plan.remove_by_conv_id(conv_id=conv_id)
 
+    def replace_by_conv_id(self, conv_id: str, plans: List[GptsPlan]):
+        self.gpts_plan.replace_by_conv_id(
+            conv_id=conv_id, plans=[item.to_dict() for item in plans]
+        )
+
 
 class MetaDbGptsMessageMemory(GptsMessageMemory):
     def __init__(self):
@@ -46,53 +46,46 @@ class GptsConversationsEntity(Model):
     __table_args__ = (
         UniqueConstraint("conv_id", name="uk_gpts_conversations"),
         Index("idx_gpts_name", "gpts_name"),
+        Index("idx_gpts_conv_user_sys", "user_code", "sys_code", "id"),
     )
 
 
 class GptsConversationsDao(BaseDao):
     def add(self, engity: GptsConversationsEntity):
-        session = self.get_raw_session()
-        session.add(engity)
-        session.commit()
-        id = engity.id
-        session.close()
-        return id
+        with self.session() as session:
+            session.add(engity)
+            session.flush()
+            return engity.id
 
     def get_by_conv_id(self, conv_id: str):
-        session = self.get_raw_session()
-        gpts_conv = session.query(GptsConversationsEntity)
-        if conv_id:
-            gpts_conv = gpts_conv.filter(GptsConversationsEntity.conv_id == conv_id)
-        result = gpts_conv.first()
-        session.close()
-        return result
+        with self.session(commit=False) as session:
+            gpts_conv = session.query(GptsConversationsEntity)
+            if conv_id:
+                gpts_conv = gpts_conv.filter(GptsConversationsEntity.conv_id == conv_id)
+            return gpts_conv.first()
 
     def get_convs(self, user_code: str = None, system_app: str = None):
-        session = self.get_raw_session()
-        gpts_conversations = session.query(GptsConversationsEntity)
-        if user_code:
-            gpts_conversations = gpts_conversations.filter(
-                GptsConversationsEntity.user_code == user_code
+        with self.session(commit=False) as session:
+            gpts_conversations = session.query(GptsConversationsEntity)
+            if user_code:
+                gpts_conversations = gpts_conversations.filter(
+                    GptsConversationsEntity.user_code == user_code
+                )
+            if system_app:
+                gpts_conversations = gpts_conversations.filter(
+                    GptsConversationsEntity.sys_code == system_app
+                )
+
+            return (
+                gpts_conversations.order_by(desc(GptsConversationsEntity.id))
+                .limit(20)
+                .all()
             )
-        if system_app:
-            gpts_conversations = gpts_conversations.filter(
-                GptsConversationsEntity.system_app == system_app
-            )
-
-        result = (
-            gpts_conversations.limit(20)
-            .order_by(desc(GptsConversationsEntity.id))
-            .all()
-        )
-        session.close()
-        return result
 
     def update(self, conv_id: str, state: str):
-        session = self.get_raw_session()
-        gpts_convs = session.query(GptsConversationsEntity)
-        gpts_convs = gpts_convs.filter(GptsConversationsEntity.conv_id == conv_id)
-        gpts_convs.update(
-            {GptsConversationsEntity.state: state}, synchronize_session="fetch"
-        )
-        session.commit()
-        session.close()
+        with self.session() as session:
+            gpts_convs = session.query(GptsConversationsEntity)
+            gpts_convs = gpts_convs.filter(GptsConversationsEntity.conv_id == conv_id)
+            gpts_convs.update(
+                {GptsConversationsEntity.state: state}, synchronize_session="fetch"
+            )
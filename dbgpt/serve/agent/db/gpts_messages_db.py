@@ -64,7 +64,6 @@ class GptsMessagesEntity(Model):
 
 class GptsMessagesDao(BaseDao):
     def append(self, entity: dict):
-        session = self.get_raw_session()
         message = GptsMessagesEntity(
             conv_id=entity.get("conv_id"),
             sender=entity.get("sender"),
@@ -78,38 +77,35 @@ class GptsMessagesDao(BaseDao):
             review_info=entity.get("review_info", None),
             action_report=entity.get("action_report", None),
         )
-        session.add(message)
-        session.commit()
-        id = message.id
-        session.close()
-        return id
+        with self.session() as session:
+            session.add(message)
+            session.flush()
+            return message.id
 
     def get_by_agent(
         self, conv_id: str, agent: str
     ) -> Optional[List[GptsMessagesEntity]]:
-        session = self.get_raw_session()
-        gpts_messages = session.query(GptsMessagesEntity)
-        if agent:
-            gpts_messages = gpts_messages.filter(
-                GptsMessagesEntity.conv_id == conv_id
-            ).filter(
-                or_(
-                    GptsMessagesEntity.sender == agent,
-                    GptsMessagesEntity.receiver == agent,
+        with self.session(commit=False) as session:
+            gpts_messages = session.query(GptsMessagesEntity)
+            if agent:
+                gpts_messages = gpts_messages.filter(
+                    GptsMessagesEntity.conv_id == conv_id
+                ).filter(
+                    or_(
+                        GptsMessagesEntity.sender == agent,
+                        GptsMessagesEntity.receiver == agent,
+                    )
                 )
-            )
-        result = gpts_messages.order_by(GptsMessagesEntity.rounds).all()
-        session.close()
-        return result
+            return gpts_messages.order_by(GptsMessagesEntity.rounds).all()
 
     def get_by_conv_id(self, conv_id: str) -> Optional[List[GptsMessagesEntity]]:
-        session = self.get_raw_session()
-        gpts_messages = session.query(GptsMessagesEntity)
-        if conv_id:
-            gpts_messages = gpts_messages.filter(GptsMessagesEntity.conv_id == conv_id)
-        result = gpts_messages.order_by(GptsMessagesEntity.rounds).all()
-        session.close()
-        return result
+        with self.session(commit=False) as session:
+            gpts_messages = session.query(GptsMessagesEntity)
+            if conv_id:
+                gpts_messages = gpts_messages.filter(
+                    GptsMessagesEntity.conv_id == conv_id
+                )
+            return gpts_messages.order_by(GptsMessagesEntity.rounds).all()
 
     def get_between_agents(
         self,
@@ -118,39 +114,35 @@ class GptsMessagesDao(BaseDao):
         agent2: str,
         current_gogal: Optional[str] = None,
     ) -> Optional[List[GptsMessagesEntity]]:
-        session = self.get_raw_session()
-        gpts_messages = session.query(GptsMessagesEntity)
-        if agent1 and agent2:
-            gpts_messages = gpts_messages.filter(
-                GptsMessagesEntity.conv_id == conv_id
-            ).filter(
-                or_(
-                    and_(
-                        GptsMessagesEntity.sender == agent1,
-                        GptsMessagesEntity.receiver == agent2,
-                    ),
-                    and_(
-                        GptsMessagesEntity.sender == agent2,
-                        GptsMessagesEntity.receiver == agent1,
-                    ),
+        with self.session(commit=False) as session:
+            gpts_messages = session.query(GptsMessagesEntity)
+            if agent1 and agent2:
+                gpts_messages = gpts_messages.filter(
+                    GptsMessagesEntity.conv_id == conv_id
+                ).filter(
+                    or_(
+                        and_(
+                            GptsMessagesEntity.sender == agent1,
+                            GptsMessagesEntity.receiver == agent2,
+                        ),
+                        and_(
+                            GptsMessagesEntity.sender == agent2,
+                            GptsMessagesEntity.receiver == agent1,
+                        ),
+                    )
+                )
+            if current_gogal:
+                gpts_messages = gpts_messages.filter(
+                    GptsMessagesEntity.current_gogal == current_gogal
                 )
-            )
-        if current_gogal:
-            gpts_messages = gpts_messages.filter(
-                GptsMessagesEntity.current_gogal == current_gogal
-            )
-        result = gpts_messages.order_by(GptsMessagesEntity.rounds).all()
-        session.close()
-        return result
+            return gpts_messages.order_by(GptsMessagesEntity.rounds).all()
 
     def get_last_message(self, conv_id: str) -> Optional[GptsMessagesEntity]:
-        session = self.get_raw_session()
-        gpts_messages = session.query(GptsMessagesEntity)
-        if conv_id:
-            gpts_messages = gpts_messages.filter(
-                GptsMessagesEntity.conv_id == conv_id
-            ).order_by(desc(GptsMessagesEntity.rounds))
+        with self.session(commit=False) as session:
+            gpts_messages = session.query(GptsMessagesEntity)
+            if conv_id:
+                gpts_messages = gpts_messages.filter(
+                    GptsMessagesEntity.conv_id == conv_id
+                ).order_by(desc(GptsMessagesEntity.rounds))
 
-        result = gpts_messages.first()
-        session.close()
-        return result
+            return gpts_messages.first()
@@ -1,10 +1,31 @@
+import itertools
+import threading
 from datetime import datetime
-
-from sqlalchemy import Column, DateTime, Integer, String, Text, UniqueConstraint
+from itertools import islice
+from typing import Iterable
+
+from cachetools import TTLCache
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    bindparam,
+    func,
+    insert,
+    select,
+    update,
+)
 
 from dbgpt.agent.common.schema import Status
 from dbgpt.storage.metadata import BaseDao, Model
 
+_TODO_STATES = (Status.TODO.value, Status.RETRYING.value)
+_COMPLETE_STATE = Status.COMPLETE.value
+
 
 class GptsPlansEntity(Model):
     __tablename__ = "gpts_plans"
@@ -43,74 +64,138 @@ class GptsPlansEntity(Model):
         onupdate=datetime.utcnow,
         comment="last update time",
     )
-    __table_args__ = (UniqueConstraint("conv_id", "sub_task_num", name="uk_sub_task"),)
+    __table_args__ = (
+        UniqueConstraint("conv_id", "sub_task_num", name="uk_sub_task"),
+        Index("idx_gpts_plans_conv_state", "conv_id", "state"),
+    )
+
+
+_TASK_WHERE = (
+    GptsPlansEntity.conv_id == bindparam("_conv_id"),
+    GptsPlansEntity.sub_task_num == bindparam("_task_num"),
+)
+# Built once at import and reused by every task transition
+_COMPLETE_TASK_STMT = (
+    update(GptsPlansEntity)
+    .where(*_TASK_WHERE)
+    .values(state=_COMPLETE_STATE, result=bindparam("_result"))
+    .execution_options(synchronize_session=False)
+)
+# A NULL agent or model keeps the current value
+_UPDATE_TASK_STMT = (
+    update(GptsPlansEntity)
+    .where(*_TASK_WHERE)
+    .values(
+        state=bindparam("_state"),
+        retry_times=bindparam("_retry_times"),
+        result=bindparam("_result"),
+        sub_task_agent=func.coalesce(
+            bindparam("_agent"), GptsPlansEntity.sub_task_agent
+        ),
+        agent_model=func.coalesce(bindparam("_model"), GptsPlansEntity.agent_model),
+    )
+    .execution_options(synchronize_session=False)
+)
 
 
 class GptsPlansDao(BaseDao):
+    def __init__(self, cache_size: int = 1024, cache_ttl: float = 5):
+        super().__init__()
+        # conv_id -> (version, plans) of the last read, dropped on every write.
+        # The cache is per process, the short ttl bounds how long writes made by
+        # other workers stay invisible.
+        self._cache: TTLCache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # conv_id -> sequence number of its last write, only needed while a read
+        # is in flight, so it expires with the cache
+        self._version: TTLCache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._write_seq = itertools.count(1)
+        self._cache_lock = threading.Lock()
+
+    def _invalidate(self, conv_id: str):
+        with self._cache_lock:
+            self._version[conv_id] = next(self._write_seq)
+            self._cache.pop(conv_id, None)
+
+    @staticmethod
+    def _insert_plans(session, plans: list[dict]):
+        # A Core executemany insert, without the ORM unit of work
+        if plans:
+            session.execute(insert(GptsPlansEntity), plans)
+
     def batch_save(self, plans: list[dict]):
-        session = self.get_raw_session()
-        session.bulk_insert_mappings(GptsPlansEntity, plans)
-        session.commit()
-        session.close()
+        with self.session() as session:
+            self._insert_plans(session, plans)
+        for conv_id in {plan.get("conv_id") for plan in plans}:
+            self._invalidate(conv_id)
+
+    def batch_save_stream(self, plans: Iterable[dict], batch_size: int = 10000):
+        """Save plans from an iterable, committing every ``batch_size`` plans.
+
+        Only one batch is held in memory at a time.
+        """
+        plans = iter(plans)
+        while batch := list(islice(plans, batch_size)):
+            self.batch_save(batch)
 
     def get_by_conv_id(self, conv_id: str) -> list[GptsPlansEntity]:
-        session = self.get_raw_session()
-        gpts_plans = session.query(GptsPlansEntity)
         if conv_id:
-            gpts_plans = gpts_plans.filter(GptsPlansEntity.conv_id == conv_id)
-        result = gpts_plans.all()
-        session.close()
-        return result
+            with self._cache_lock:
+                version = self._version.get(conv_id, 0)
+                cached = self._cache.get(conv_id)
+            if cached is not None and cached[0] == version:
+                return list(cached[1])
+        stmt = select(GptsPlansEntity)
+        if conv_id:
+            stmt = stmt.where(GptsPlansEntity.conv_id == conv_id)
+        with self.session(commit=False) as session:
+            plans = session.execute(stmt).scalars().all()
+        if conv_id:
+            with self._cache_lock:
+                # A write that raced with the load changed the version, keep it out
+                if self._version.get(conv_id, 0) == version:
+                    self._cache[conv_id] = (version, plans)
+        return list(plans)
 
     def get_by_task_id(self, task_id: int) -> list[GptsPlansEntity]:
-        session = self.get_raw_session()
-        gpts_plans = session.query(GptsPlansEntity)
+        stmt = select(GptsPlansEntity)
         if task_id:
-            gpts_plans = gpts_plans.filter(GptsPlansEntity.id == task_id)
-        result = gpts_plans.first()
-        session.close()
-        return result
+            stmt = stmt.where(GptsPlansEntity.id == task_id)
+        with self.session(commit=False) as session:
+            return session.execute(stmt.limit(1)).scalars().first()
 
     def get_by_conv_id_and_num(
         self, conv_id: str, task_nums: list
     ) -> list[GptsPlansEntity]:
-        session = self.get_raw_session()
-        gpts_plans = session.query(GptsPlansEntity)
+        stmt = select(GptsPlansEntity)
         if conv_id:
-            gpts_plans = gpts_plans.filter(GptsPlansEntity.conv_id == conv_id).filter(
-                GptsPlansEntity.sub_task_num.in_(task_nums)
+            stmt = stmt.where(
+                GptsPlansEntity.conv_id == conv_id,
+                GptsPlansEntity.sub_task_num.in_(task_nums),
             )
-        result = gpts_plans.all()
-        session.close()
-        return result
+        with self.session(commit=False) as session:
+            return session.execute(stmt).scalars().all()
 
     def get_todo_plans(self, conv_id: str) -> list[GptsPlansEntity]:
-        session = self.get_raw_session()
-        gpts_plans = session.query(GptsPlansEntity)
         if not conv_id:
             return []
-        gpts_plans = gpts_plans.filter(GptsPlansEntity.conv_id == conv_id).filter(
-            GptsPlansEntity.state.in_([Status.TODO.value, Status.RETRYING.value])
+        stmt = (
+            select(GptsPlansEntity)
+            .where(
+                GptsPlansEntity.conv_id == conv_id,
+                GptsPlansEntity.state.in_(_TODO_STATES),
+            )
+            .order_by(GptsPlansEntity.sub_task_num)
         )
-        result = gpts_plans.order_by(GptsPlansEntity.sub_task_num).all()
-        session.close()
-        return result
+        with self.session(commit=False) as session:
+            return session.execute(stmt).scalars().all()
 
     def complete_task(self, conv_id: str, task_num: int, result: str):
-        session = self.get_raw_session()
-        gpts_plans = session.query(GptsPlansEntity)
-        gpts_plans = gpts_plans.filter(GptsPlansEntity.conv_id == conv_id).filter(
-            GptsPlansEntity.sub_task_num == task_num
-        )
-        gpts_plans.update(
-            {
-                GptsPlansEntity.state: Status.COMPLETE.value,
-                GptsPlansEntity.result: result,
-            },
-            synchronize_session="fetch",
-        )
-        session.commit()
-        session.close()
+        with self.session() as session:
+            session.execute(
+                _COMPLETE_TASK_STMT,
+                {"_conv_id": conv_id, "_task_num": task_num, "_result": result},
+            )
+        self._invalidate(conv_id)
 
     def update_task(
         self,
@@ -122,30 +207,40 @@ class GptsPlansDao(BaseDao):
         model: str = None,
         result: str = None,
     ):
-        session = self.get_raw_session()
-        gpts_plans = session.query(GptsPlansEntity)
-        gpts_plans = gpts_plans.filter(GptsPlansEntity.conv_id == conv_id).filter(
-            GptsPlansEntity.sub_task_num == task_num
-        )
-        update_param = {}
-        update_param[GptsPlansEntity.state] = state
-        update_param[GptsPlansEntity.retry_times] = retry_times
-        update_param[GptsPlansEntity.result] = result
-        if agent:
-            update_param[GptsPlansEntity.sub_task_agent] = agent
-        if model:
-            update_param[GptsPlansEntity.agent_model] = model
-
-        gpts_plans.update(update_param, synchronize_session="fetch")
-        session.commit()
-        session.close()
+        with self.session() as session:
+            session.execute(
+                _UPDATE_TASK_STMT,
+                {
+                    "_conv_id": conv_id,
+                    "_task_num": task_num,
+                    "_state": state,
+                    "_retry_times": retry_times,
+                    "_result": result,
+                    "_agent": agent or None,
+                    "_model": model or None,
+                },
+            )
+        self._invalidate(conv_id)
 
     def remove_by_conv_id(self, conv_id: str):
-        session = self.get_raw_session()
         if conv_id is None:
             raise Exception("conv_id is None")
 
-        gpts_plans = session.query(GptsPlansEntity)
-        gpts_plans.filter(GptsPlansEntity.conv_id == conv_id).delete()
-        session.commit()
-        session.close()
+        with self.session() as session:
+            gpts_plans = session.query(GptsPlansEntity)
+            gpts_plans.filter(GptsPlansEntity.conv_id == conv_id).delete()
+        self._invalidate(conv_id)
+
+    def replace_by_conv_id(self, conv_id: str, plans: list[dict]):
+        """Delete the old plans and insert the new ones in a single transaction.
+
+        Readers never see the conversation without a plan in between.
+        """
+        if conv_id is None:
+            raise Exception("conv_id is None")
+        with self.session() as session:
+            session.query(GptsPlansEntity).filter(
+                GptsPlansEntity.conv_id == conv_id
+            ).delete(synchronize_session=False)
+            self._insert_plans(session, plans)
+        self._invalidate(conv_id)
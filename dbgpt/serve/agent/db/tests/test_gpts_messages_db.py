@@ -0,0 +1,50 @@
+import pytest
+
+from dbgpt.storage.metadata import db
+
+from ..gpts_messages_db import GptsMessagesDao
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    db.init_db("sqlite:///:memory:")
+    db.create_all()
+
+    yield
+
+
+@pytest.fixture
+def dao():
+    return GptsMessagesDao()
+
+
+def _message(sender: str, receiver: str, rounds: int, current_gogal: str = None):
+    return {
+        "conv_id": "conv1",
+        "sender": sender,
+        "receiver": receiver,
+        "content": f"{sender} to {receiver}",
+        "rounds": rounds,
+        "current_gogal": current_gogal,
+    }
+
+
+def test_append_returns_id(dao):
+    first = dao.append(_message("Planner", "Coder", 1))
+    second = dao.append(_message("Coder", "Planner", 2))
+    assert first and second and first != second
+
+
+def test_reads(dao):
+    dao.append(_message("Planner", "Coder", 1, "goal1"))
+    dao.append(_message("Coder", "Planner", 2, "goal1"))
+    dao.append(_message("Coder", "Reporter", 3, "goal2"))
+
+    assert [m.rounds for m in dao.get_by_conv_id("conv1")] == [1, 2, 3]
+    assert [m.rounds for m in dao.get_by_agent("conv1", "Planner")] == [1, 2]
+    assert [m.content for m in dao.get_between_agents("conv1", "Planner", "Coder")] == [
+        "Planner to Coder",
+        "Coder to Planner",
+    ]
+    assert dao.get_between_agents("conv1", "Coder", "Reporter", "goal1") == []
+    assert dao.get_last_message("conv1").rounds == 3
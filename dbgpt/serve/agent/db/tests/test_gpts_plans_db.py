@@ -0,0 +1,185 @@
+import time
+
+import pytest
+
+from dbgpt.storage.metadata import db
+
+from ..gpts_plans_db import GptsPlansDao
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    db.init_db("sqlite:///:memory:")
+    db.create_all()
+
+    yield
+
+
+@pytest.fixture
+def dao():
+    return GptsPlansDao()
+
+
+def _plans(conv_id: str, nums):
+    return [
+        {
+            "conv_id": conv_id,
+            "sub_task_num": num,
+            "sub_task_title": f"title {num}",
+            "sub_task_content": f"content {num}",
+            "sub_task_agent": "Coder",
+            "state": "todo",
+        }
+        for num in nums
+    ]
+
+
+def test_get_by_conv_id_is_cached(dao):
+    dao.batch_save(_plans("conv1", [1, 2]))
+    first = dao.get_by_conv_id("conv1")
+    second = dao.get_by_conv_id("conv1")
+    assert first[0] is second[0]
+    # Callers get their own list
+    assert first is not second
+
+
+def test_cache_invalidated_by_batch_save(dao):
+    dao.batch_save(_plans("conv1", [1]))
+    assert len(dao.get_by_conv_id("conv1")) == 1
+    dao.batch_save(_plans("conv1", [2]))
+    assert len(dao.get_by_conv_id("conv1")) == 2
+
+
+def test_cache_invalidated_by_update_task(dao):
+    dao.batch_save(_plans("conv1", [1]))
+    assert dao.get_by_conv_id("conv1")[0].state == "todo"
+    dao.update_task("conv1", 1, "retrying", 1)
+    assert dao.get_by_conv_id("conv1")[0].state == "retrying"
+    dao.complete_task("conv1", 1, "done")
+    assert dao.get_by_conv_id("conv1")[0].state == "complete"
+
+
+def test_cache_invalidated_by_remove_by_conv_id(dao):
+    dao.batch_save(_plans("conv1", [1]))
+    dao.batch_save(_plans("conv2", [1]))
+    assert dao.get_by_conv_id("conv1")
+    assert dao.get_by_conv_id("conv2")
+    dao.remove_by_conv_id("conv1")
+    assert dao.get_by_conv_id("conv1") == []
+    assert len(dao.get_by_conv_id("conv2")) == 1
+
+
+def test_cache_invalidated_by_replace_by_conv_id(dao):
+    dao.batch_save(_plans("conv1", [1, 2]))
+    assert len(dao.get_by_conv_id("conv1")) == 2
+    dao.replace_by_conv_id("conv1", _plans("conv1", [3]))
+    assert [plan.sub_task_num for plan in dao.get_by_conv_id("conv1")] == [3]
+
+
+def test_cache_is_bounded():
+    dao = GptsPlansDao(cache_size=2)
+    for i in range(5):
+        conv_id = f"conv{i}"
+        dao.batch_save(_plans(conv_id, [1]))
+        dao.get_by_conv_id(conv_id)
+    assert len(dao._cache) <= 2
+    assert len(dao._version) <= 2
+
+
+def test_cache_expires():
+    dao = GptsPlansDao(cache_ttl=0.01)
+    dao.batch_save(_plans("conv1", [1]))
+    first = dao.get_by_conv_id("conv1")
+    time.sleep(0.05)
+    assert dao.get_by_conv_id("conv1")[0] is not first[0]
+
+
+def test_read_entities_outlive_the_session(dao):
+    dao.batch_save(_plans("conv1", [1, 2]))
+    plans = dao.get_todo_plans("conv1")
+    # The session is closed, the loaded attributes are still readable
+    assert [plan.sub_task_title for plan in plans] == ["title 1", "title 2"]
+    assert dao.get_by_task_id(plans[0].id).sub_task_num == 1
+
+
+def test_failed_write_rolls_back(dao):
+    dao.batch_save(_plans("conv1", [1]))
+    with pytest.raises(Exception):
+        # Violates uk_sub_task, the whole batch is rolled back
+        dao.batch_save(_plans("conv1", [2, 1]))
+    assert [plan.sub_task_num for plan in dao.get_by_conv_id("conv1")] == [1]
+    # The session scope released the connection, later writes still work
+    dao.batch_save(_plans("conv1", [2]))
+    assert len(dao.get_by_conv_id("conv1")) == 2
+
+
+def test_task_updates_do_not_touch_other_tasks(dao):
+    dao.batch_save(_plans("conv1", [1, 2]))
+    dao.batch_save(_plans("conv2", [1]))
+    dao.complete_task("conv1", 1, "done")
+    states = {
+        (plan.conv_id, plan.sub_task_num): plan.state
+        for conv_id in ("conv1", "conv2")
+        for plan in dao.get_by_conv_id(conv_id)
+    }
+    assert states == {
+        ("conv1", 1): "complete",
+        ("conv1", 2): "todo",
+        ("conv2", 1): "todo",
+    }
+
+
+def test_batch_save_stream_commits_per_batch(dao):
+    batches = []
+    save = dao.batch_save
+    dao.batch_save = lambda plans: batches.append(len(plans)) or save(plans)
+
+    dao.batch_save_stream(iter(_plans("conv1", range(1, 6))), batch_size=2)
+    assert batches == [2, 2, 1]
+    assert len(dao.get_by_conv_id("conv1")) == 5
+
+
+def test_batch_save_stream_keeps_committed_batches(dao):
+    def plans():
+        yield from _plans("conv1", [1, 2, 3])
+        raise RuntimeError("source failed")
+
+    with pytest.raises(RuntimeError):
+        dao.batch_save_stream(plans(), batch_size=2)
+    # The first batch was committed before the source failed
+    assert [plan.sub_task_num for plan in dao.get_by_conv_id("conv1")] == [1, 2]
+
+
+def test_batch_save_stream_empty(dao):
+    dao.batch_save_stream([], batch_size=2)
+    assert dao.get_by_conv_id("conv1") == []
+
+
+def _task(dao, conv_id: str, task_num: int):
+    return next(
+        plan for plan in dao.get_by_conv_id(conv_id) if plan.sub_task_num == task_num
+    )
+
+
+@pytest.mark.parametrize("agent, model", [(None, None), ("", "")])
+def test_update_task_keeps_agent_and_model_when_missing(dao, agent, model):
+    plans = _plans("conv1", [1])
+    plans[0]["agent_model"] = "gpt-4"
+    dao.batch_save(plans)
+
+    dao.update_task("conv1", 1, "running", 1, agent=agent, model=model, result="r")
+    task = _task(dao, "conv1", 1)
+    assert (task.state, task.retry_times, task.result) == ("running", 1, "r")
+    assert (task.sub_task_agent, task.agent_model) == ("Coder", "gpt-4")
+
+
+def test_update_task_overwrites_agent_and_model(dao):
+    dao.batch_save(_plans("conv1", [1, 2]))
+
+    dao.update_task("conv1", 1, "failed", 2, agent="Reporter", model="gpt-3.5")
+    task = _task(dao, "conv1", 1)
+    assert (task.state, task.retry_times, task.result) == ("failed", 2, None)
+    assert (task.sub_task_agent, task.agent_model) == ("Reporter", "gpt-3.5")
+    # Other tasks of the conversation are left alone
+    other = _task(dao, "conv1", 2)
+    assert (other.state, other.sub_task_agent) == ("todo", "Coder")
@@ -1,11 +1,19 @@
+import atexit
+import contextlib
+import importlib
+import io
 import logging
+import multiprocessing
 import os
 import pathlib
 import re
 import subprocess
 import sys
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from hashlib import md5
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
@@ -19,6 +27,14 @@ from typing import Callable, Dict, List, Optional, Tuple, Union
 #   The \r?\n makes sure there is a linebreak before ```.
 #   The [ \t]* matches the potential spaces before closing ``` (the spec allows indentation).
 CODE_BLOCK_PATTERN = r"```[ \t]*(\w+)?[ \t]*\r?\n(.*?)\r?\n[ \t]*```"
+_CODE_BLOCK_RE = re.compile(CODE_BLOCK_PATTERN, flags=re.DOTALL)
+# Multi-line code block or inline code (`([^`]+)`), separated by the | operator
+_CODE_OR_INLINE_RE = re.compile(CODE_BLOCK_PATTERN + r"|`([^`]+)`")
+# Same as CODE_BLOCK_PATTERN, but also captures a leading "# filename: " line
+_CODE_BLOCK_WITH_FILENAME_RE = re.compile(
+    r"```[ \t]*(\w+)?[ \t]*\r?\n((?:# filename: ([^\r\n]*))?.*?)\r?\n[ \t]*```",
+    flags=re.DOTALL,
+)
 WORKING_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "extensions")
 UNKNOWN = "unknown"
 TIMEOUT_MSG = "Timeout"
@@ -88,13 +104,14 @@ def extract_code(
     """
     text = content_str(text)
     if not detect_single_line_code:
-        match = re.findall(pattern, text, flags=re.DOTALL)
+        if pattern == CODE_BLOCK_PATTERN:
+            match = _CODE_BLOCK_RE.findall(text)
+        else:
+            match = re.findall(pattern, text, flags=re.DOTALL)
         return match if match else [(UNKNOWN, text)]
 
-    # Extract both multi-line and single-line code block, separated by the | operator
-    # `([^`]+)`: Matches inline code.
-    code_pattern = re.compile(CODE_BLOCK_PATTERN + r"|`([^`]+)`")
-    code_blocks = code_pattern.findall(text)
+    # Extract both multi-line and single-line code block
+    code_blocks = _CODE_OR_INLINE_RE.findall(text)
 
     # Extract the individual code blocks and languages from the matched groups
     extracted = []
@@ -107,6 +124,28 @@ def extract_code(
     return extracted
 
 
+def parse_code_blocks(text: Union[str, List]) -> List[Tuple[str, Optional[str], str]]:
+    """Extract code blocks with their resolved language and filename in one pass.
+
+    Unlike :func:`extract_code`, the language is already lower-cased, or inferred
+    with :func:`infer_lang` when the block has no language tag, and the filename
+    from a leading ``# filename: `` line is returned alongside the code.
+
+    Args:
+        text (str or List): The content to extract code from.
+
+    Returns:
+        list: A list of (language, filename, code) tuples. If there is no code
+          block in the input text, a single ("unknown", None, text) is returned.
+    """
+    text = content_str(text)
+    blocks = []
+    for lang, code, filename in _CODE_BLOCK_WITH_FILENAME_RE.findall(text):
+        lang = lang.lower() if lang else infer_lang(code).lower()
+        blocks.append((lang, filename.strip() or None, code))
+    return blocks if blocks else [(UNKNOWN, None, text)]
+
+
 if __name__ == "__main__":
     print(
         extract_code(
@@ -137,6 +176,33 @@ def timeout_handler(signum, frame):
     raise TimeoutError("Timed out!")
 
 
+def _ensure_docker_image(
+    docker, client, use_docker: Union[List[str], str, bool]
+) -> str:
+    """Return the first image of `use_docker` that exists locally or can be pulled."""
+    image_list = (
+        ["python:3-alpine", "python:3", "python:3-windowsservercore"]
+        if use_docker is True
+        else [use_docker]
+        if isinstance(use_docker, str)
+        else use_docker
+    )
+    for image in image_list:
+        # check if the image exists
+        try:
+            client.images.get(image)
+            break
+        except docker.errors.ImageNotFound:
+            # pull the image
+            print("Pulling image", image)
+            try:
+                client.images.pull(image)
+                break
+            except docker.errors.DockerException:
+                print("Failed to pull image", image)
+    return image
+
+
 def _cmd(lang):
     if lang.startswith("python") or lang in ["bash", "sh", "powershell"]:
         return lang
@@ -147,6 +213,34 @@ def _cmd(lang):
     raise NotImplementedError(f"{lang} not recognized in code execution")
 
 
+def _resolve_use_docker(use_docker: Optional[Union[List[str], str, bool]]):
+    """Return the docker module, or None when unavailable, and the resolved use_docker."""
+    # Warn if use_docker was unspecified (or None), and cannot be provided (the default).
+    # In this case the current behavior is to fall back to run natively, but this behavior
+    # is subject to change.
+
+    try:
+        import docker
+
+        try:
+            docker.version
+        except AttributeError:
+            docker = None
+    except ImportError:
+        docker = None
+
+    if use_docker is None:
+        if docker is None:
+            use_docker = False
+            logger.warning(
+                "execute_code was called without specifying a value for use_docker. Since the python docker package is not available, code will be run natively. Note: this fallback behavior is subject to change"
+            )
+        else:
+            # Default to true
+            use_docker = True
+    return docker, use_docker
+
+
 def execute_code(
     code: Optional[str] = None,
     timeout: Optional[int] = None,
@@ -195,29 +289,7 @@ def execute_code(
         logger.error(error_msg)
         raise AssertionError(error_msg)
 
-    # Warn if use_docker was unspecified (or None), and cannot be provided (the default).
-    # In this case the current behavior is to fall back to run natively, but this behavior
-    # is subject to change.
-
-    try:
-        import docker
-
-        try:
-            docker.version
-        except AttributeError:
-            docker = None
-    except ImportError:
-        docker = None
-
-    if use_docker is None:
-        if docker is None:
-            use_docker = False
-            logger.warning(
-                "execute_code was called without specifying a value for use_docker. Since the python docker package is not available, code will be run natively. Note: this fallback behavior is subject to change"
-            )
-        else:
-            # Default to true
-            use_docker = True
+    docker, use_docker = _resolve_use_docker(use_docker)
 
     timeout = timeout or DEFAULT_TIMEOUT
     original_filename = filename
@@ -284,26 +356,7 @@ def execute_code(
 
     # create a docker client
     client = docker.from_env()
-    image_list = (
-        ["python:3-alpine", "python:3", "python:3-windowsservercore"]
-        if use_docker is True
-        else [use_docker]
-        if isinstance(use_docker, str)
-        else use_docker
-    )
-    for image in image_list:
-        # check if the image exists
-        try:
-            client.images.get(image)
-            break
-        except docker.errors.ImageNotFound:
-            # pull the image
-            print("Pulling image", image)
-            try:
-                client.images.pull(image)
-                break
-            except docker.errors.DockerException:
-                print("Failed to pull image", image)
+    image = _ensure_docker_image(docker, client, use_docker)
     # get a randomized str based on current time to wrap the exit code
     exit_code_str = f"exitcode{time.time()}"
     abs_path = pathlib.Path(work_dir).absolute()
@@ -358,6 +411,250 @@ def execute_code(
     return exit_code, logs, f"python:{tag}"
 
 
+# Modules imported once by every pooled python worker, so that code blocks using
+# them do not pay the import cost on each run.
+PREIMPORT_MODULES = ("numpy", "pandas", "matplotlib", "requests")
+_PYTHON_POOL: Optional[ProcessPoolExecutor] = None
+_PYTHON_POOL_LOCK = threading.Lock()
+
+
+def _preimport_modules():
+    for name in PREIMPORT_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+
+
+def _get_python_pool() -> ProcessPoolExecutor:
+    global _PYTHON_POOL
+    with _PYTHON_POOL_LOCK:
+        if _PYTHON_POOL is None:
+            # Forking a multithreaded server can deadlock the child on locks held
+            # by other threads, so the workers are started from a clean process
+            start_method = (
+                "forkserver"
+                if "forkserver" in multiprocessing.get_all_start_methods()
+                else "spawn"
+            )
+            _PYTHON_POOL = ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=_preimport_modules,
+            )
+        return _PYTHON_POOL
+
+
+def _reset_python_pool():
+    """Terminate the pooled workers, e.g. after a timeout left one busy."""
+    global _PYTHON_POOL
+    with _PYTHON_POOL_LOCK:
+        pool, _PYTHON_POOL = _PYTHON_POOL, None
+    if pool is None:
+        return
+    # ProcessPoolExecutor has no public way to kill a busy worker, shutdown only
+    # waits for it. This relies on the CPython internal `_processes` mapping
+    # (pid -> Process) and degrades to a plain shutdown if it is missing.
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _exec_python_in_worker(
+    code: str, filename: Optional[str], work_dir: str
+) -> Tuple[int, str, str]:
+    os.chdir(work_dir)
+    stdout, stderr = io.StringIO(), io.StringIO()
+    exitcode = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(
+                compile(code, filename or "<agent>", "exec"),
+                {"__name__": "__main__", "__builtins__": __builtins__},
+            )
+        except SystemExit as e:
+            if e.code is None:
+                exitcode = 0
+            elif isinstance(e.code, int):
+                exitcode = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                exitcode = 1
+        except BaseException:
+            traceback.print_exc()
+            exitcode = 1
+    return exitcode, stdout.getvalue(), stderr.getvalue()
+
+
+def execute_code_in_pool(
+    code: str,
+    timeout: Optional[int] = None,
+    filename: Optional[str] = None,
+    work_dir: Optional[str] = None,
+) -> Tuple[int, str, None]:
+    """Execute python code in a warm worker process instead of a new interpreter.
+
+    The workers are long-lived and have :data:`PREIMPORT_MODULES` imported
+    already, so the cost of starting python and importing common libraries is
+    paid once. The code must be trusted, like the non-docker path of
+    :func:`execute_code`.
+
+    Args:
+        code (str): The python code to execute.
+        timeout (Optional, int): The maximum execution time in seconds.
+            On timeout the worker processes are terminated.
+        filename (Optional, str): If provided, the code is also saved to this
+            file (relative to the working directory), as :func:`execute_code` does.
+        work_dir (Optional, str): The working directory for the code execution.
+
+    Returns:
+        int: 0 if the code executes successfully.
+        str: The error message if the code fails to execute; the stdout otherwise.
+        image: Always None.
+    """
+    timeout = timeout or DEFAULT_TIMEOUT
+    if work_dir is None:
+        work_dir = WORKING_DIR
+    os.makedirs(work_dir, exist_ok=True)
+    if filename is not None:
+        filepath = os.path.join(work_dir, filename)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w", encoding="utf-8") as fout:
+            fout.write(code)
+
+    future = _get_python_pool().submit(_exec_python_in_worker, code, filename, work_dir)
+    try:
+        exitcode, stdout, stderr = future.result(timeout=timeout)
+    except TimeoutError:
+        _reset_python_pool()
+        return 1, TIMEOUT_MSG, None
+    except BrokenProcessPool as e:
+        _reset_python_pool()
+        return 1, f"Python worker exited unexpectedly: {e}", None
+    return exitcode, stderr if exitcode else stdout, None
+
+
+class _SandboxPool:
+    """Long-lived docker containers to `docker exec` code blocks into.
+
+    One container is kept per (image, working directory, network), with the
+    working directory mounted at /workspace like :func:`execute_code` does, so
+    the container start-up cost is paid once instead of once per code block.
+    A long-lived container is a wider target than a one-shot one, so it has no
+    network unless asked for.
+    """
+
+    def __init__(self):
+        self._containers: Dict[Tuple[str, str, bool], object] = {}
+        self._lock = threading.Lock()
+
+    def get(self, client, image: str, work_dir: str, network_disabled: bool = True):
+        from docker.errors import APIError
+
+        key = (image, work_dir, network_disabled)
+        with self._lock:
+            container = self._containers.pop(key, None)
+            if container is not None:
+                try:
+                    container.reload()
+                except APIError:
+                    # Exited containers are auto removed, start a new one
+                    container = None
+            if container is None or container.status != "running":
+                container = client.containers.run(
+                    image,
+                    command=["sleep", "infinity"],
+                    working_dir="/workspace",
+                    detach=True,
+                    auto_remove=True,
+                    network_disabled=network_disabled,
+                    volumes={work_dir: {"bind": "/workspace", "mode": "rw"}},
+                )
+            self._containers[key] = container
+            return container
+
+    def discard(self, image: str, work_dir: str, network_disabled: bool = True):
+        with self._lock:
+            container = self._containers.pop((image, work_dir, network_disabled), None)
+        if container is not None:
+            try:
+                container.stop(timeout=1)
+            except Exception:
+                pass
+
+    def close(self):
+        for key in list(self._containers):
+            self.discard(*key)
+
+
+_SANDBOX_POOL = _SandboxPool()
+atexit.register(_SANDBOX_POOL.close)
+
+
+def execute_code_in_sandbox(
+    code: str,
+    timeout: Optional[int] = None,
+    filename: Optional[str] = None,
+    work_dir: Optional[str] = None,
+    use_docker: Optional[Union[List[str], str, bool]] = None,
+    lang: Optional[str] = "python",
+    network_disabled: bool = True,
+) -> Tuple[int, str, Optional[str]]:
+    """Execute code in a warm docker container instead of a new one per call.
+
+    The arguments and return values are the same as :func:`execute_code`, plus
+    ``network_disabled`` to give the container network access. ``use_docker`` is
+    resolved as in :func:`execute_code`, and whenever that would not run the code
+    in a new container, it falls back to :func:`execute_code`. The container is
+    kept between calls, so files and installed packages persist as they do with
+    the committed images of :func:`execute_code`. A timed out container is
+    discarded.
+    """
+    docker, use_docker = _resolve_use_docker(use_docker)
+    if not use_docker or docker is None or os.path.exists("/.dockerenv"):
+        return execute_code(
+            code,
+            timeout=timeout,
+            filename=filename,
+            work_dir=work_dir,
+            use_docker=use_docker,
+            lang=lang,
+        )
+
+    timeout = timeout or DEFAULT_TIMEOUT
+    original_filename = filename
+    if filename is None:
+        code_hash = md5(code.encode()).hexdigest()
+        filename = f"tmp_code_{code_hash}.{'py' if lang.startswith('python') else lang}"
+    if work_dir is None:
+        work_dir = WORKING_DIR
+    filepath = os.path.join(work_dir, filename)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with open(filepath, "w", encoding="utf-8") as fout:
+        fout.write(code)
+
+    client = docker.from_env()
+    image = _ensure_docker_image(docker, client, use_docker)
+    abs_path = str(pathlib.Path(work_dir).absolute())
+    container = _SANDBOX_POOL.get(client, image, abs_path, network_disabled)
+    try:
+        exit_code, output = container.exec_run(
+            ["timeout", str(timeout), _cmd(lang), filename], workdir="/workspace"
+        )
+    finally:
+        if original_filename is None:
+            os.remove(filepath)
+    logs = output.decode("utf-8").rstrip()
+    if exit_code in (124, 143):
+        # killed by timeout, the container may be left in an unknown state
+        _SANDBOX_POOL.discard(image, abs_path, network_disabled)
+        return 1, TIMEOUT_MSG, image
+    if exit_code:
+        logs = logs.replace(
+            f"/workspace/{filename if original_filename is None else ''}", ""
+        )
+    return exit_code, logs, image
+
+
 _GENERATE_ASSERTIONS_CONFIG = {
     "prompt": """Given the signature and docstring, write the exactly same number of assertion(s) for the provided example(s) in the docstring, without assertion messages.
 
@@ -45,48 +45,57 @@ def extract_char_position(error_message: str) -> int:
         raise ValueError("Character position not found in the error message.")
 
 
+# The only characters that change the state of `find_json_objects`. A backslash
+# only matters for the quote or backslash after it (newlines in between are
+# ignored outside of strings), so they are matched together.
+_JSON_STRUCTURE_RE = re.compile(r'\\\n*[\\"]?|["{}\[\]]')
+
+
 def find_json_objects(text):
+    """Find the top-level json objects and arrays in a text.
+
+    Only quotes, brackets and escapes are visited (found with a regex search), the
+    text in between is skipped instead of being walked character by character.
+    """
     json_objects = []
     inside_string = False
-    escape_character = False
     stack = []
     start_index = -1
 
-    for i, char in enumerate(text):
-        # Handle escape characters
-        if char == "\\" and not escape_character:
-            escape_character = True
+    pos = 0
+    while True:
+        match = _JSON_STRUCTURE_RE.search(text, pos)
+        if match is None:
+            break
+        char = match.group()
+        pos = match.end()
+        if char[0] == "\\":
+            if inside_string and "\n" in char:
+                # A newline inside a string ends the escape, rescan after it
+                pos = match.start() + 1
             continue
-
-        # Toggle inside_string flag
-        if char == '"' and not escape_character:
+        if char == '"':
             inside_string = not inside_string
-
-        if not inside_string and char == "\n":
             continue
-        if inside_string and char == "\n":
-            char = "\\n"
-        if inside_string and char == "\t":
-            char = "\\t"
+        if inside_string:
+            continue
 
         # Handle opening brackets
-        if char in "{[" and not inside_string:
+        if char in "{[":
             stack.append(char)
             if len(stack) == 1:
-                start_index = i
+                start_index = match.start()
         # Handle closing brackets
-        if char in "}]" and not inside_string and stack:
-            if (char == "}" and stack[-1] == "{") or (char == "]" and stack[-1] == "["):
-                stack.pop()
-                if not stack:
-                    end_index = i + 1
-                    try:
-                        json_obj = json.loads(text[start_index:end_index])
-                        json_objects.append(json_obj)
-                    except json.JSONDecodeError:
-                        pass
-        # Reset escape_character flag
-        escape_character = False if escape_character else escape_character
+        elif stack and (
+            (char == "}" and stack[-1] == "{") or (char == "]" and stack[-1] == "[")
+        ):
+            stack.pop()
+            if not stack:
+                try:
+                    json_obj = json.loads(text[start_index:pos])
+                    json_objects.append(json_obj)
+                except json.JSONDecodeError:
+                    pass
 
     return json_objects
 
@@ -73,13 +73,11 @@ def extract_content_open_ending(long_string, s1, s2, is_include: bool = False):
     return match_map
 
 
+_TRUE_STRINGS = frozenset(("true", "t", "1", "yes", "y"))
+
+
 def str_to_bool(s):
-    if s.lower() in ("true", "t", "1", "yes", "y"):
-        return True
-    elif s.lower() in ("false", "f", "0", "no", "n"):
-        return False
-    else:
-        return False
+    return s.lower() in _TRUE_STRINGS
 
 
 def _to_str(x, charset="utf8", errors="strict"):
@@ -0,0 +1,188 @@
+import pytest
+
+from dbgpt.util import code_utils
+from dbgpt.util.code_utils import (
+    TIMEOUT_MSG,
+    UNKNOWN,
+    _get_python_pool,
+    _reset_python_pool,
+    _SandboxPool,
+    execute_code_in_pool,
+    execute_code_in_sandbox,
+    extract_code,
+    parse_code_blocks,
+)
+
+
+class _FakeContainer:
+    def __init__(self, status="running", removed=False):
+        self.status = status
+        self.removed = removed
+
+    def reload(self):
+        from docker.errors import NotFound
+
+        if self.removed:
+            raise NotFound("container removed")
+
+
+class _FakeContainers:
+    def __init__(self):
+        self.run_kwargs = []
+
+    def run(self, image, **kwargs):
+        self.run_kwargs.append(kwargs)
+        return _FakeContainer()
+
+
+class _FakeDockerClient:
+    def __init__(self):
+        self.containers = _FakeContainers()
+
+
+def test_sandbox_pool_reuses_running_container():
+    pytest.importorskip("docker")
+    pool, client = _SandboxPool(), _FakeDockerClient()
+    container = pool.get(client, "python:3-slim", "/tmp/work")
+    assert pool.get(client, "python:3-slim", "/tmp/work") is container
+    assert len(client.containers.run_kwargs) == 1
+    assert client.containers.run_kwargs[0]["network_disabled"] is True
+
+
+def test_sandbox_pool_recreates_removed_container():
+    pytest.importorskip("docker")
+    pool, client = _SandboxPool(), _FakeDockerClient()
+    container = pool.get(client, "python:3-slim", "/tmp/work")
+    # auto_remove deletes the container once it exits
+    container.removed = True
+    new_container = pool.get(client, "python:3-slim", "/tmp/work")
+    assert new_container is not container
+    assert pool.get(client, "python:3-slim", "/tmp/work") is new_container
+
+
+def test_sandbox_pool_recreates_exited_container():
+    pytest.importorskip("docker")
+    pool, client = _SandboxPool(), _FakeDockerClient()
+    container = pool.get(client, "python:3-slim", "/tmp/work")
+    container.status = "exited"
+    assert pool.get(client, "python:3-slim", "/tmp/work") is not container
+
+
+def test_sandbox_pool_keys_on_network():
+    pytest.importorskip("docker")
+    pool, client = _SandboxPool(), _FakeDockerClient()
+    offline = pool.get(client, "python:3-slim", "/tmp/work")
+    online = pool.get(client, "python:3-slim", "/tmp/work", network_disabled=False)
+    assert offline is not online
+    assert client.containers.run_kwargs[1]["network_disabled"] is False
+
+
+@pytest.fixture
+def native_execute(monkeypatch):
+    calls = []
+    execute_code = code_utils.execute_code
+
+    def fake_execute_code(code, **kwargs):
+        calls.append(kwargs["use_docker"])
+        return execute_code(code, **kwargs)
+
+    monkeypatch.setattr(code_utils, "execute_code", fake_execute_code)
+    return calls
+
+
+def test_sandbox_without_docker_package_runs_like_execute_code(
+    monkeypatch, native_execute, tmp_path
+):
+    monkeypatch.setattr(
+        code_utils, "_resolve_use_docker", lambda use_docker: (None, False)
+    )
+    result = execute_code_in_sandbox("print('hello')", work_dir=str(tmp_path))
+    assert result == (0, "hello\n", None)
+    assert native_execute == [False]
+
+
+def test_sandbox_respects_use_docker_false(native_execute, tmp_path):
+    result = execute_code_in_sandbox(
+        "print('hello')", work_dir=str(tmp_path), use_docker=False
+    )
+    assert result == (0, "hello\n", None)
+    assert native_execute == [False]
+
+
+def test_sandbox_defaults_use_docker_like_execute_code(monkeypatch):
+    resolved = []
+
+    def resolve(use_docker):
+        resolved.append(use_docker)
+        return None, False
+
+    monkeypatch.setattr(code_utils, "_resolve_use_docker", resolve)
+    monkeypatch.setattr(code_utils, "execute_code", lambda code, **kwargs: kwargs)
+    assert execute_code_in_sandbox("print(1)")["use_docker"] is False
+    assert resolved == [None]
+
+
+@pytest.fixture
+def python_pool():
+    yield
+    _reset_python_pool()
+
+
+def test_execute_code_in_pool(python_pool, tmp_path):
+    exitcode, logs, image = execute_code_in_pool(
+        "print('hello')", work_dir=str(tmp_path)
+    )
+    assert (exitcode, logs.strip(), image) == (0, "hello", None)
+    assert _get_python_pool()._mp_context.get_start_method() in (
+        "forkserver",
+        "spawn",
+    )
+
+
+def test_execute_code_in_pool_error(python_pool, tmp_path):
+    exitcode, logs, _ = execute_code_in_pool(
+        "raise ValueError('boom')", work_dir=str(tmp_path)
+    )
+    assert exitcode == 1
+    assert "ValueError: boom" in logs
+
+
+def test_execute_code_in_pool_timeout(python_pool, tmp_path):
+    exitcode, logs, _ = execute_code_in_pool(
+        "import time\ntime.sleep(30)", timeout=1, work_dir=str(tmp_path)
+    )
+    assert (exitcode, logs) == (1, TIMEOUT_MSG)
+    # The pool is rebuilt after the busy worker was terminated
+    exitcode, logs, _ = execute_code_in_pool("print(1)", work_dir=str(tmp_path))
+    assert (exitcode, logs.strip()) == (0, "1")
+
+
+def test_parse_code_blocks_language_and_filename():
+    text = (
+        "Run this:\n"
+        "```Python\n# filename: hello.py\nprint('hello')\n```\n"
+        "then\n"
+        "```sh\npip install requests\n```"
+    )
+    assert parse_code_blocks(text) == [
+        ("python", "hello.py", "# filename: hello.py\nprint('hello')"),
+        ("sh", None, "pip install requests"),
+    ]
+
+
+def test_parse_code_blocks_infers_language():
+    assert parse_code_blocks("```\nprint(1)\n```") == [("python", None, "print(1)")]
+    assert parse_code_blocks("```\npip install x\n```") == [
+        ("sh", None, "pip install x")
+    ]
+
+
+def test_parse_code_blocks_without_fence():
+    assert parse_code_blocks("just text") == [(UNKNOWN, None, "just text")]
+
+
+def test_parse_code_blocks_matches_extract_code():
+    text = "```python\nx = 1\n```\n```bash\nls\n```"
+    assert [(lang, code) for lang, _, code in parse_code_blocks(text)] == list(
+        extract_code(text)
+    )
@@ -0,0 +1,19 @@
+import pytest
+from dbgpt.util.json_utils import find_json_objects
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("no json here", []),
+        ('```json\n[{"a": 1}, {"b": "x"}]\n```', [[{"a": 1}, {"b": "x"}]]),
+        ('{"a": 1} and {"b": [1, 2]}', [{"a": 1}, {"b": [1, 2]}]),
+        ('{"a": "brackets } ] in a string"}', [{"a": "brackets } ] in a string"}]),
+        ('{"a": "escaped \\" quote }"}', [{"a": 'escaped " quote }'}]),
+        ('{"a": "backslash \\\\"}', [{"a": "backslash \\"}]),
+        ("{not json} [1, 2]", [[1, 2]]),
+        ('{"a": [1, 2}', []),
+    ],
+)
+def test_find_json_objects(text, expected):
+    assert find_json_objects(text) == expected
@@ -6,16 +6,28 @@ import logging.handlers
 from typing import Any, List
 
 import os
+import sys
 import asyncio
 
 from dbgpt.configs.model_config import LOGDIR
 
+
+def _plain(x, *args, **kwargs):
+    return x
+
+
 try:
-    from termcolor import colored
+    from termcolor import colored as _termcolor_colored
 except ImportError:
-
-    def colored(x, *args, **kwargs):
-        return x
+    _termcolor_colored = None
+
+# Color codes are only useful on a terminal, skip them when the output is
+# captured (server mode, log files).
+_isatty = getattr(sys.stdout, "isatty", None)
+if _termcolor_colored is not None and _isatty is not None and _isatty():
+    colored = _termcolor_colored
+else:
+    colored = _plain
 
 
 server_error_msg = (